@@ -16,12 +16,13 @@ pub struct SshConfigDto {
 
 #[tauri::command]
 pub async fn ssh_connect(config: SshConfigDto) -> Result<serde_json::Value, String> {
+    // DTO 按值传入，字段直接移动，无需克隆
     let ssh_config = SshConfig {
-        host: config.host.clone(),
+        host: config.host,
         port: config.port,
-        username: config.username.clone(),
-        password: config.password.clone(),
-        key_file: config.key_file.clone(),
+        username: config.username,
+        password: config.password,
+        key_file: config.key_file,
     };
 
     match SshClient::connect(ssh_config).await {
@@ -49,15 +50,12 @@ pub async fn execute_query(
 
 #[tauri::command]
 pub async fn export_to_csv(
-    data: serde_json::Value,
+    data: QueryResult,
     file_path: String,
     query_type: Option<String>,
 ) -> Result<(), String> {
-    // 将JSON值反序列化为QueryResult
-    let query_result: QueryResult = serde_json::from_value(data)
-        .map_err(|e| format!("解析查询结果失败: {}", e))?;
-    
-    export::export_to_csv(query_result, file_path, query_type).await
+    // 参数直接反序列化为 QueryResult，不再经过中间的 serde_json::Value
+    export::export_to_csv(data, file_path, query_type).await
 }
 
 #[derive(Debug, serde::Deserialize)]
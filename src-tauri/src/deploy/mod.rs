@@ -1,8 +1,15 @@
-use crate::ssh::SshClient;
+use crate::export::BEIJING_TZ;
+use crate::ssh::{quote_shell_single, SshClient};
 use serde::{Deserialize, Serialize};
+use sha2::{Digest, Sha256};
+use std::collections::HashMap;
+use std::sync::OnceLock;
 use anyhow::Result;
-use tauri::AppHandle;
+use flate2::write::GzEncoder;
+use flate2::Compression;
+use tauri::{AppHandle, Emitter};
 use tempfile::NamedTempFile;
+use uuid::Uuid;
 
 #[derive(Debug, Deserialize)]
 #[serde(rename_all = "camelCase")]
@@ -35,156 +42,68 @@ const BINARY_NAME: &str = "ancol";
 const SERVICE_FILE: &str = "/etc/systemd/system/ancol.service";
 const SERVICE_USER: &str = "analysis";
 
-pub async fn check_deploy_status() -> Result<DeployStatus, String> {
+/// 构造部署状态检查脚本：可执行文件、服务文件、运行状态、启用状态在一次远程执行中全部取得，
+/// 每项输出一行 key=value
+fn build_status_check_command() -> String {
+    format!(
+        "echo \"installed=$(test -f {dir}/bin/{bin} && echo 1 || echo 0)\"; \
+echo \"service_exists=$(sudo test -f {svc_file} && echo 1 || echo 0)\"; \
+echo \"active=$(systemctl is-active {svc} 2>/dev/null)\"; \
+echo \"enabled=$(systemctl is-enabled {svc} 2>/dev/null)\"",
+        dir = INSTALL_DIR,
+        bin = BINARY_NAME,
+        svc_file = SERVICE_FILE,
+        svc = SERVICE_NAME
+    )
+}
+
+/// 解析状态检查脚本输出；服务文件不存在时不采信运行/启用状态
+fn parse_deploy_status(output: &str) -> DeployStatus {
     let mut status = DeployStatus {
         installed: false,
         service_exists: false,
         service_running: false,
         service_enabled: false,
     };
-    
-    // 辅助函数：从输出中提取结果（处理多行输出和警告）
-    fn extract_result(output: &str) -> Option<bool> {
-        let lines: Vec<&str> = output.lines().collect();
-        // 查找包含 'exists' 或 'not_exists' 的行
-        for line in &lines {
-            let trimmed = line.trim();
-            if trimmed == "exists" {
-                return Some(true);
-            } else if trimmed == "not_exists" {
-                return Some(false);
-            }
-        }
-        // 如果没有找到明确的结果，检查是否包含关键字
-        let output_lower = output.to_lowercase();
-        if output_lower.contains("exists") && !output_lower.contains("not_exists") {
-            Some(true)
-        } else if output_lower.contains("not_exists") {
-            Some(false)
-        } else {
-            None
-        }
-    }
-    
-    // 辅助函数：从输出中提取状态（处理多行输出，如 'active'/'inactive' 或 'enabled'/'disabled'）
-    fn extract_status(output: &str, positive: &str, negative: &str) -> Option<bool> {
-        let lines: Vec<&str> = output.lines().collect();
-        // 查找包含状态关键字的行
-        for line in &lines {
-            let trimmed = line.trim();
-            if trimmed == positive {
-                return Some(true);
-            } else if trimmed == negative {
-                return Some(false);
-            }
-        }
-        // 如果没有找到明确的结果，检查是否包含关键字
-        let output_lower = output.to_lowercase();
-        if output_lower.contains(positive) && !output_lower.contains(negative) {
-            Some(true)
-        } else if output_lower.contains(negative) {
-            Some(false)
-        } else {
-            None
+    for line in output.lines() {
+        let Some((key, value)) = line.trim().split_once('=') else {
+            continue;
+        };
+        let value = value.trim();
+        match key {
+            "installed" => status.installed = value == "1",
+            "service_exists" => status.service_exists = value == "1",
+            "active" => status.service_running = value == "active",
+            "enabled" => status.service_enabled = value == "enabled",
+            _ => {}
         }
     }
-    
-    // 检查可执行文件
-    let check_binary = format!(
-        "test -f {}/bin/{} && echo 'exists' || echo 'not_exists'",
-        INSTALL_DIR, BINARY_NAME
-    );
-    match SshClient::execute_command(&check_binary).await {
-        Ok((exit_status, stdout, stderr)) => {
-            status.installed = extract_result(&stdout).unwrap_or(false);
-            // 调试信息：记录命令执行结果
-            eprintln!("[DEBUG] 检查可执行文件: 命令='{}', 退出码={}, stdout='{}', stderr='{}', 提取结果={}, 最终结果={}", 
-                check_binary, exit_status, stdout.trim(), stderr.trim(), 
-                extract_result(&stdout).map(|v| v.to_string()).unwrap_or_else(|| "None".to_string()),
-                status.installed);
-        }
-        Err(e) => {
-            eprintln!("[DEBUG] 检查可执行文件失败: 命令='{}', 错误='{}'", check_binary, e);
-        }
+    if !status.service_exists {
+        status.service_running = false;
+        status.service_enabled = false;
     }
-    
-    // 检查服务文件（使用sudo，因为/etc/systemd/system需要root权限）
-    let check_service_file = format!(
-        "sudo test -f {} && echo 'exists' || echo 'not_exists'",
-        SERVICE_FILE
-    );
-    match SshClient::execute_command(&check_service_file).await {
+    status
+}
+
+/// 状态检查脚本只由常量拼成，首次使用时生成一次，之后每次检查直接复用
+fn status_check_command() -> &'static str {
+    static COMMAND: OnceLock<String> = OnceLock::new();
+    COMMAND.get_or_init(build_status_check_command)
+}
+
+pub async fn check_deploy_status() -> Result<DeployStatus, String> {
+    let status = match SshClient::execute_command(status_check_command()).await {
         Ok((exit_status, stdout, stderr)) => {
-            status.service_exists = extract_result(&stdout).unwrap_or(false);
             // 调试信息：记录命令执行结果
-            eprintln!("[DEBUG] 检查服务文件(sudo): 命令='{}', 退出码={}, stdout='{}', stderr='{}', 提取结果={}, 最终结果={}", 
-                check_service_file, exit_status, stdout.trim(), stderr.trim(),
-                extract_result(&stdout).map(|v| v.to_string()).unwrap_or_else(|| "None".to_string()),
-                status.service_exists);
+            eprintln!("[DEBUG] 检查部署状态: 退出码={}, stdout='{}', stderr='{}'",
+                exit_status, stdout.trim(), stderr.trim());
+            parse_deploy_status(&stdout)
         }
         Err(e) => {
-            eprintln!("[DEBUG] 检查服务文件(sudo)失败: 命令='{}', 错误='{}'", check_service_file, e);
-            // 如果sudo失败，尝试不使用sudo（某些系统可能配置了无密码sudo）
-            let check_service_file_no_sudo = format!(
-                "test -f {} && echo 'exists' || echo 'not_exists'",
-                SERVICE_FILE
-            );
-            match SshClient::execute_command(&check_service_file_no_sudo).await {
-                Ok((exit_status, stdout, stderr)) => {
-                    status.service_exists = extract_result(&stdout).unwrap_or(false);
-                    eprintln!("[DEBUG] 检查服务文件(无sudo): 命令='{}', 退出码={}, stdout='{}', stderr='{}', 提取结果={}, 最终结果={}", 
-                        check_service_file_no_sudo, exit_status, stdout.trim(), stderr.trim(),
-                        extract_result(&stdout).map(|v| v.to_string()).unwrap_or_else(|| "None".to_string()),
-                        status.service_exists);
-                }
-                Err(e2) => {
-                    eprintln!("[DEBUG] 检查服务文件(无sudo)失败: 命令='{}', 错误='{}'", check_service_file_no_sudo, e2);
-                }
-            }
-        }
-    }
-    
-    if status.service_exists {
-        // 检查服务状态
-        let check_active = format!(
-            "systemctl is-active {} 2>/dev/null && echo 'active' || echo 'inactive'",
-            SERVICE_NAME
-        );
-        match SshClient::execute_command(&check_active).await {
-            Ok((exit_status, stdout, stderr)) => {
-                status.service_running = extract_status(&stdout, "active", "inactive").unwrap_or(false);
-                // 调试信息：记录命令执行结果
-                eprintln!("[DEBUG] 检查服务运行状态: 命令='{}', 退出码={}, stdout='{}', stderr='{}', 提取结果={}, 最终结果={}", 
-                    check_active, exit_status, stdout.trim(), stderr.trim(),
-                    extract_status(&stdout, "active", "inactive").map(|v| v.to_string()).unwrap_or_else(|| "None".to_string()),
-                    status.service_running);
-            }
-            Err(e) => {
-                eprintln!("[DEBUG] 检查服务运行状态失败: 命令='{}', 错误='{}'", check_active, e);
-            }
-        }
-        
-        // 检查服务是否启用
-        let check_enabled = format!(
-            "systemctl is-enabled {} 2>/dev/null && echo 'enabled' || echo 'disabled'",
-            SERVICE_NAME
-        );
-        match SshClient::execute_command(&check_enabled).await {
-            Ok((exit_status, stdout, stderr)) => {
-                status.service_enabled = extract_status(&stdout, "enabled", "disabled").unwrap_or(false);
-                // 调试信息：记录命令执行结果
-                eprintln!("[DEBUG] 检查服务启用状态: 命令='{}', 退出码={}, stdout='{}', stderr='{}', 提取结果={}, 最终结果={}", 
-                    check_enabled, exit_status, stdout.trim(), stderr.trim(),
-                    extract_status(&stdout, "enabled", "disabled").map(|v| v.to_string()).unwrap_or_else(|| "None".to_string()),
-                    status.service_enabled);
-            }
-            Err(e) => {
-                eprintln!("[DEBUG] 检查服务启用状态失败: 命令='{}', 错误='{}'", check_enabled, e);
-            }
+            eprintln!("[DEBUG] 检查部署状态失败: 命令='{}', 错误='{}'", status_check_command(), e);
+            parse_deploy_status("")
         }
-    } else {
-        eprintln!("[DEBUG] 服务文件不存在，跳过服务状态检查");
-    }
+    };
     
     // 输出最终状态摘要
     eprintln!("[DEBUG] 状态检查完成: installed={}, service_exists={}, service_running={}, service_enabled={}", 
@@ -195,24 +114,38 @@ pub async fn check_deploy_status() -> Result<DeployStatus, String> {
 
 // 添加时间戳的日志辅助函数（使用 GMT+8 时区）
 fn log_with_time(message: &str) -> String {
-    use chrono::{Utc, FixedOffset};
-    let beijing_tz = FixedOffset::east_opt(8 * 3600).unwrap();
-    let now = Utc::now().with_timezone(&beijing_tz);
+    let now = chrono::Utc::now().with_timezone(&BEIJING_TZ);
     format!("[{}] {}", now.format("%H:%M:%S"), message)
 }
 
-// 添加日志并实时发送事件
-fn add_log_and_emit(app_handle: Option<&AppHandle>, logs: &mut Vec<String>, message: &str) {
-    let log_message = log_with_time(message);
-    logs.push(log_message.clone());
-    
-    // 如果提供了 AppHandle，实时发送事件
-    if let Some(handle) = app_handle {
-        use tauri::Emitter;
-        let _ = handle.emit("deploy-log", &log_message);
+/// 部署日志：统一记录带时间戳的日志，并在提供 AppHandle 时实时发送事件
+struct DeployLogger {
+    app_handle: Option<AppHandle>,
+    logs: Vec<String>,
+}
+
+impl DeployLogger {
+    fn new(app_handle: Option<AppHandle>) -> Self {
+        Self { app_handle, logs: Vec::new() }
+    }
+
+    // 先发送事件再存入列表，日志字符串无需额外复制
+    fn log(&mut self, message: &str) {
+        let log_message = log_with_time(message);
+        if let Some(handle) = &self.app_handle {
+            let _ = handle.emit("deploy-log", &log_message);
+        }
+        self.logs.push(log_message);
+    }
+
+    fn into_logs(self) -> Vec<String> {
+        self.logs
     }
 }
 
+/// sudo 在主机名无法解析时输出的无害警告片段
+const BENIGN_SUDO_WARNING: &str = "unable to resolve host";
+
 // 过滤无害的警告信息
 fn filter_benign_warnings(text: &str) -> Option<String> {
     let trimmed = text.trim();
@@ -220,24 +153,229 @@ fn filter_benign_warnings(text: &str) -> Option<String> {
         return None;
     }
     
-    // 过滤常见的无害 sudo 警告
-    let benign_patterns = [
-        "unable to resolve host",
-        "unable to resolve hostname",
-        "sudo: unable to resolve host",
-        "sudo: unable to resolve hostname",
-    ];
-    
-    let lower = trimmed.to_lowercase();
-    for pattern in &benign_patterns {
-        if lower.contains(pattern) {
-            return None; // 过滤掉这个警告
-        }
+    // 过滤常见的无害 sudo 警告（"sudo: unable to resolve host/hostname ..." 都包含该片段）。
+    // 逐个窗口做 ASCII 大小写无关比较，不再为整段输出生成小写副本
+    if trimmed
+        .as_bytes()
+        .windows(BENIGN_SUDO_WARNING.len())
+        .any(|window| window.eq_ignore_ascii_case(BENIGN_SUDO_WARNING.as_bytes()))
+    {
+        return None; // 过滤掉这个警告
     }
     
     Some(trimmed.to_string())
 }
 
+/// 生成单个文件从暂存位置安装到目标位置的命令：建目录、替换文件、按类型设置权限
+fn build_install_step(staged_remote: &str, remote_path: &str) -> String {
+    let staged = quote_shell_single(staged_remote);
+    let target = quote_shell_single(remote_path);
+    let mut step = String::new();
+    
+    // 获取目标目录（rsplit 的各段是倒序的，直接 join 会把路径拼反，这里只取最后一个 / 之前的部分）
+    let remote_dir = remote_path.rsplit_once('/').map(|(dir, _)| dir).unwrap_or("");
+    if !remote_dir.is_empty() {
+        step.push_str(&format!("sudo mkdir -p {} && ", quote_shell_single(&remote_dir)));
+    }
+    
+    // 判断文件类型，设置不同的权限
+    let is_binary = remote_path.contains("/bin/") || !remote_path.ends_with(".toml") && !remote_path.ends_with(".json");
+    if is_binary {
+        step.push_str(&format!(
+            "sudo rm -f {t} && sudo mv {s} {t} && sudo chmod +x {t} && sudo chown root:root {t}",
+            s = staged, t = target
+        ));
+    } else {
+        step.push_str(&format!(
+            "sudo rm -f {t} && sudo mv {s} {t} && sudo chmod 644 {t}",
+            s = staged, t = target
+        ));
+    }
+    step
+}
+
+/// 生成 systemd 服务文件内容，非 root 运行时指定服务用户
+fn build_service_unit(use_root: bool) -> String {
+    let user_line = if use_root {
+        String::new()
+    } else {
+        format!("User={}\n", SERVICE_USER)
+    };
+    format!(
+        r#"[Unit]
+Description=Analysis Data Collector
+After=network.target
+
+[Service]
+Type=simple
+{}WorkingDirectory={}
+ExecStart={}/bin/{} --config {}/config.toml
+Restart=always
+RestartSec=5
+
+[Install]
+WantedBy=multi-user.target"#,
+        user_line, INSTALL_DIR, INSTALL_DIR, BINARY_NAME, INSTALL_DIR
+    )
+}
+
+/// 生成上传完成后的安装脚本：安装各文件、创建运行用户并设置目录所有者、部署服务文件并重新加载 systemd。
+/// 服务文件未变化时（staged_service 为 None）不替换服务文件也不重新加载 systemd。
+/// 所有步骤以 && 串联，在一次远程执行中完成；无论成败最后都清理暂存目录并保留退出码
+fn build_post_upload_command(install_steps: &[String], staged_service: Option<&str>, use_root: bool, staging_dir: &str) -> String {
+    let mut steps: Vec<String> = install_steps.to_vec();
+    if !use_root {
+        steps.push(format!(
+            "{{ id {u} >/dev/null 2>&1 || sudo useradd -r -s /bin/false {u}; }}",
+            u = SERVICE_USER
+        ));
+        // 只修改属主不符的条目，已归属服务用户的文件不再逐个重写元数据；-h 避免跟随符号链接
+        steps.push(format!(
+            "sudo find {} \\( ! -user {u} -o ! -group {u} \\) -exec chown -h {u}:{u} {{}} +",
+            INSTALL_DIR,
+            u = SERVICE_USER
+        ));
+    }
+    if let Some(staged_service) = staged_service {
+        steps.push(format!(
+            "sudo mv {} {} && sudo systemctl daemon-reload",
+            quote_shell_single(staged_service),
+            SERVICE_FILE
+        ));
+    }
+    if steps.is_empty() {
+        steps.push("true".to_string());
+    }
+    format!(
+        "{{ {}; }}; rc=$?; rm -rf {}; exit $rc",
+        steps.join(" && "),
+        quote_shell_single(staging_dir)
+    )
+}
+
+/// 流式计算本地文件的 SHA-256（十六进制小写）
+fn sha256_file(path: &str) -> std::io::Result<String> {
+    use std::io::Read;
+    let mut file = std::fs::File::open(path)?;
+    let mut hasher = Sha256::new();
+    let mut buf = vec![0u8; 1024 * 1024];
+    loop {
+        let n = file.read(&mut buf)?;
+        if n == 0 {
+            break;
+        }
+        hasher.update(&buf[..n]);
+    }
+    Ok(format!("{:x}", hasher.finalize()))
+}
+
+/// 生成一次性获取多个远程文件 SHA-256 的命令；不存在的文件不输出
+fn build_remote_hash_command(remote_paths: &[&str]) -> String {
+    let quoted: Vec<String> = remote_paths.iter().map(|p| quote_shell_single(p)).collect();
+    format!("sudo sha256sum {} 2>/dev/null; true", quoted.join(" "))
+}
+
+/// 生成上传前的准备命令：创建暂存目录与安装目录、按需停止服务、检查 gunzip、获取远程文件哈希。
+/// 各步骤失败时输出 mkdir_failed / stop_failed / no_gunzip 标记行而不中断，哈希行由 parse_remote_hashes 解析
+fn build_prepare_command(staging_dir: &str, stop_service: bool, remote_paths: &[&str]) -> String {
+    let mut cmd = format!(
+        "{{ mkdir -p {} && sudo mkdir -p {}/bin; }} || echo mkdir_failed; ",
+        quote_shell_single(staging_dir),
+        INSTALL_DIR
+    );
+    if stop_service {
+        cmd.push_str(&format!("sudo systemctl stop {} || echo stop_failed; ", SERVICE_NAME));
+    }
+    cmd.push_str("command -v gunzip >/dev/null 2>&1 || echo no_gunzip; ");
+    cmd.push_str(&build_remote_hash_command(remote_paths));
+    cmd
+}
+
+/// 解析 sha256sum 输出（"<hash>  <path>"），返回 路径 -> 哈希
+fn parse_remote_hashes(output: &str) -> HashMap<String, String> {
+    output
+        .lines()
+        .filter_map(|line| {
+            let (hash, path) = line.split_once("  ")?;
+            if hash.len() != 64 || !hash.bytes().all(|b| b.is_ascii_hexdigit()) {
+                return None;
+            }
+            Some((path.to_string(), hash.to_ascii_lowercase()))
+        })
+        .collect()
+}
+
+/// 不小于该大小的文件压缩后上传（主要针对可执行文件）
+const COMPRESS_UPLOAD_MIN_SIZE: u64 = 1024 * 1024;
+
+/// 将本地文件 gzip 压缩到临时文件，返回的临时文件在 drop 时自动删除
+fn gzip_to_temp_file(path: &str) -> std::io::Result<NamedTempFile> {
+    use std::io::Write;
+    let mut input = std::io::BufReader::new(std::fs::File::open(path)?);
+    let temp_file = NamedTempFile::new()?;
+    let mut encoder = GzEncoder::new(std::io::BufWriter::new(temp_file.reopen()?), Compression::default());
+    std::io::copy(&mut input, &mut encoder)?;
+    encoder.finish()?.flush()?;
+    Ok(temp_file)
+}
+
+/// 服务就绪轮询的退避间隔（秒），总计约 3.5 秒，服务进入 active 后立即结束
+const WAIT_ACTIVE_DELAYS: [&str; 6] = ["0.1", "0.2", "0.4", "0.8", "1", "1"];
+
+/// 生成等待服务就绪的命令：按退避间隔轮询 is-active，随后输出 active=<状态> 与 systemctl status 详情
+fn build_wait_active_command() -> String {
+    format!(
+        "for d in {delays}; do systemctl is-active --quiet {svc} && break; sleep $d; done; \
+echo \"active=$(systemctl is-active {svc} 2>/dev/null)\"; sudo systemctl status {svc} --no-pager -l",
+        delays = WAIT_ACTIVE_DELAYS.join(" "),
+        svc = SERVICE_NAME
+    )
+}
+
+/// 解析等待服务就绪命令的输出，返回 (is-active 状态, status 详情)
+fn parse_wait_active_output(output: &str) -> (&str, &str) {
+    let trimmed = output.trim_start();
+    match trimmed.split_once('\n') {
+        Some((first, rest)) if first.starts_with("active=") => (first["active=".len()..].trim(), rest),
+        None if trimmed.starts_with("active=") => (trimmed["active=".len()..].trim(), ""),
+        _ => ("", output),
+    }
+}
+
+/// 生成启动服务的命令：未运行时 enable --now 一步完成启用与启动，运行中则重启后启用；
+/// 成功后接着等待服务就绪并输出状态详情，退出码保留启动步骤的结果
+fn build_start_service_command(restart: bool) -> String {
+    let start = if restart {
+        format!("sudo systemctl restart {svc} && sudo systemctl enable {svc}", svc = SERVICE_NAME)
+    } else {
+        format!("sudo systemctl enable --now {}", SERVICE_NAME)
+    };
+    format!(
+        "{}; rc=$?; if [ $rc -eq 0 ]; then {}; fi; exit $rc",
+        start,
+        build_wait_active_command()
+    )
+}
+
+/// 生成一次检查多个远程文件是否存在的命令，按传入顺序每个文件输出一行 1/0
+fn build_files_exist_command(remote_paths: &[&str]) -> String {
+    let quoted: Vec<String> = remote_paths.iter().map(|p| quote_shell_single(p)).collect();
+    format!(
+        "for f in {}; do if test -f \"$f\"; then echo 1; else echo 0; fi; done",
+        quoted.join(" ")
+    )
+}
+
+/// 解析文件存在性检查输出，顺序与传入的路径一致
+fn parse_files_exist_output(output: &str) -> Vec<bool> {
+    output
+        .lines()
+        .map(str::trim)
+        .filter(|line| *line == "1" || *line == "0")
+        .map(|line| line == "1")
+        .collect()
+}
+
 // 格式化文件大小
 fn format_file_size(size: u64) -> String {
     if size < 1024 {
@@ -250,7 +388,7 @@ fn format_file_size(size: u64) -> String {
 }
 
 pub async fn deploy_application(app_handle: Option<AppHandle>, config: DeployConfig) -> Result<Vec<String>, String> {
-    let mut logs = Vec::new();
+    let mut logger = DeployLogger::new(app_handle);
     
     // 判断操作类型
     let upload_files: Vec<&DeployFile> = config.files.iter()
@@ -270,32 +408,42 @@ pub async fn deploy_application(app_handle: Option<AppHandle>, config: DeployCon
         return Err("无效的操作：没有选择上传、下载或重启服务".to_string());
     };
     
-    add_log_and_emit(app_handle.as_ref(), &mut logs, "=========================================");
-    add_log_and_emit(app_handle.as_ref(), &mut logs, &format!("开始{}流程", operation_type));
-    add_log_and_emit(app_handle.as_ref(), &mut logs, "=========================================");
+    logger.log("=========================================");
+    logger.log(&format!("开始{}流程", operation_type));
+    logger.log("=========================================");
     
     // 显示操作配置
-    add_log_and_emit(app_handle.as_ref(), &mut logs, &format!("操作配置:"));
-    add_log_and_emit(app_handle.as_ref(), &mut logs, &format!("  - 操作类型: {}", operation_type));
-    add_log_and_emit(app_handle.as_ref(), &mut logs, &format!("  - 上传文件数: {}", upload_files.len()));
-    add_log_and_emit(app_handle.as_ref(), &mut logs, &format!("  - 下载文件数: {}", download_files.len()));
-    add_log_and_emit(app_handle.as_ref(), &mut logs, &format!("  - 运行用户: {}", if config.use_root { "root" } else { SERVICE_USER }));
-    add_log_and_emit(app_handle.as_ref(), &mut logs, &format!("  - 重启服务: {}", config.restart_service));
+    logger.log(&format!("操作配置:"));
+    logger.log(&format!("  - 操作类型: {}", operation_type));
+    logger.log(&format!("  - 上传文件数: {}", upload_files.len()));
+    logger.log(&format!("  - 下载文件数: {}", download_files.len()));
+    logger.log(&format!("  - 运行用户: {}", if config.use_root { "root" } else { SERVICE_USER }));
+    logger.log(&format!("  - 重启服务: {}", config.restart_service));
+    
+    // 本地文件哈希在阻塞线程池中计算，与下面的远程状态检查并行进行
+    let local_hash_task = if !upload_files.is_empty() {
+        let local_paths: Vec<String> = upload_files.iter().map(|f| f.local_path.clone().unwrap()).collect();
+        Some(tokio::task::spawn_blocking(move || {
+            local_paths.iter().map(|p| sha256_file(p).ok()).collect::<Vec<Option<String>>>()
+        }))
+    } else {
+        None
+    };
     
     // 检查部署状态（仅在上传或重启服务时检查）
     let status = if !upload_files.is_empty() || config.restart_service {
-        add_log_and_emit(app_handle.as_ref(), &mut logs, "检查当前部署状态...");
+        logger.log("检查当前部署状态...");
         match check_deploy_status().await {
             Ok(s) => {
-                add_log_and_emit(app_handle.as_ref(), &mut logs, &format!("  可执行文件: {}", if s.installed { "已安装" } else { "未安装" }));
-                add_log_and_emit(app_handle.as_ref(), &mut logs, &format!("  服务文件: {}", if s.service_exists { "存在" } else { "不存在" }));
-                add_log_and_emit(app_handle.as_ref(), &mut logs, &format!("  服务状态: {}", if s.service_running { "运行中" } else { "未运行" }));
-                add_log_and_emit(app_handle.as_ref(), &mut logs, &format!("  服务启用: {}", if s.service_enabled { "已启用" } else { "未启用" }));
+                logger.log(&format!("  可执行文件: {}", if s.installed { "已安装" } else { "未安装" }));
+                logger.log(&format!("  服务文件: {}", if s.service_exists { "存在" } else { "不存在" }));
+                logger.log(&format!("  服务状态: {}", if s.service_running { "运行中" } else { "未运行" }));
+                logger.log(&format!("  服务启用: {}", if s.service_enabled { "已启用" } else { "未启用" }));
                 Some(s)
             }
             Err(e) => {
                 let err_msg = format!("检查部署状态失败: {}", e);
-                add_log_and_emit(app_handle.as_ref(), &mut logs, &format!("  ⚠️ {}", err_msg));
+                logger.log(&format!("  ⚠️ {}", err_msg));
                 return Err(err_msg);
             }
         }
@@ -303,357 +451,310 @@ pub async fn deploy_application(app_handle: Option<AppHandle>, config: DeployCon
         None
     };
     
-    // 如果是上传操作且服务正在运行，先停止服务
-    if !upload_files.is_empty() {
-        if let Some(ref status) = status {
-            if status.service_running {
-                add_log_and_emit(app_handle.as_ref(), &mut logs, "停止现有服务...");
-                let stop_cmd = format!("sudo systemctl stop {}", SERVICE_NAME);
-                match SshClient::execute_command(&stop_cmd).await {
-                    Ok((exit_status, stdout, stderr)) => {
-                        if exit_status == 0 {
-                            add_log_and_emit(app_handle.as_ref(), &mut logs, "  ✓ 服务已停止");
-                            if let Some(output) = filter_benign_warnings(&stdout) {
-                                add_log_and_emit(app_handle.as_ref(), &mut logs, &format!("  输出: {}", output));
-                            }
-                        } else {
-                            add_log_and_emit(app_handle.as_ref(), &mut logs, &format!("  ⚠️ 停止服务返回非零退出码: {}", exit_status));
-                            if let Some(error) = filter_benign_warnings(&stderr) {
-                                add_log_and_emit(app_handle.as_ref(), &mut logs, &format!("  错误: {}", error));
-                            }
-                        }
-                    }
-                    Err(e) => {
-                        add_log_and_emit(app_handle.as_ref(), &mut logs, &format!("  ✗ 停止服务失败: {}", e));
-                    }
-                }
-            }
-        }
-    }
-    
-    // 处理文件上传
+    // 处理文件上传：先把所有文件上传到远程暂存目录，再用一条命令统一安装到目标位置
     if !upload_files.is_empty() {
-        // 创建目录结构（如果需要）
-        add_log_and_emit(app_handle.as_ref(), &mut logs, &format!("创建目录结构: {}/bin", INSTALL_DIR));
-        let mkdir_cmd = format!("sudo mkdir -p {}/bin", INSTALL_DIR);
-        match SshClient::execute_command(&mkdir_cmd).await {
-            Ok((exit_status, stdout, stderr)) => {
-                if exit_status == 0 {
-                    add_log_and_emit(app_handle.as_ref(), &mut logs, "  ✓ 目录结构创建成功");
-                    if let Some(output) = filter_benign_warnings(&stdout) {
-                        add_log_and_emit(app_handle.as_ref(), &mut logs, &format!("  输出: {}", output));
-                    }
-                } else {
-                    let filtered_stderr = filter_benign_warnings(&stderr).unwrap_or_else(|| stderr.trim().to_string());
-                    let err_msg = format!("创建目录失败: 退出码 {}, 错误: {}", exit_status, filtered_stderr);
-                    add_log_and_emit(app_handle.as_ref(), &mut logs, &format!("  ⚠️ {}", err_msg));
-                }
-            }
-            Err(e) => {
-                add_log_and_emit(app_handle.as_ref(), &mut logs, &format!("  ⚠️ 创建目录失败: {}", e));
-            }
-        }
-        
-        // 上传每个文件
+        // 检查本地文件
+        let mut local_sizes: Vec<u64> = Vec::with_capacity(upload_files.len());
         for (idx, file) in upload_files.iter().enumerate() {
             let local_path = file.local_path.as_ref().unwrap();
             let remote_path = file.remote_path.as_ref().unwrap();
             
-            add_log_and_emit(app_handle.as_ref(), &mut logs, &format!("上传文件 {}/{}: {}", idx + 1, upload_files.len(), remote_path));
+            logger.log(&format!("准备上传文件 {}/{}: {}", idx + 1, upload_files.len(), remote_path));
             
-            // 检查本地文件
+            // 一次 stat 同时得到存在性、文件类型与大小
             match std::fs::metadata(local_path) {
+                Ok(metadata) if !metadata.is_file() => {
+                    let err_msg = format!("本地路径不是普通文件: {}", local_path);
+                    logger.log(&format!("  ✗ {}", err_msg));
+                    return Err(err_msg);
+                }
                 Ok(metadata) => {
                     let file_size = metadata.len();
-                    add_log_and_emit(app_handle.as_ref(), &mut logs, &format!("  本地文件: {}", local_path));
-                    add_log_and_emit(app_handle.as_ref(), &mut logs, &format!("  文件大小: {}", format_file_size(file_size)));
+                    logger.log(&format!("  本地文件: {}", local_path));
+                    logger.log(&format!("  文件大小: {}", format_file_size(file_size)));
+                    local_sizes.push(file_size);
                 }
                 Err(e) => {
                     let err_msg = format!("无法读取本地文件 {}: {}", local_path, e);
-                    add_log_and_emit(app_handle.as_ref(), &mut logs, &format!("  ✗ {}", err_msg));
-                    return Err(err_msg);
-                }
-            }
-            
-            // 生成临时文件名
-            let file_name = remote_path.split('/').last().unwrap_or("file");
-            let temp_remote = format!("/tmp/{}", file_name);
-            add_log_and_emit(app_handle.as_ref(), &mut logs, &format!("  上传到临时位置: {}", temp_remote));
-            
-            // 上传文件
-            match SshClient::upload_file(local_path, &temp_remote).await {
-                Ok(_) => {
-                    add_log_and_emit(app_handle.as_ref(), &mut logs, "  ✓ 文件上传成功");
-                }
-                Err(e) => {
-                    let err_msg = format!("上传文件失败: {}", e);
-                    add_log_and_emit(app_handle.as_ref(), &mut logs, &format!("  ✗ {}", err_msg));
+                    logger.log(&format!("  ✗ {}", err_msg));
                     return Err(err_msg);
                 }
             }
-            
-            // 移动到目标位置并设置权限
-            add_log_and_emit(app_handle.as_ref(), &mut logs, &format!("部署文件到目标位置: {}", remote_path));
-            
-            // 获取目标目录
-            let remote_dir = remote_path.rsplit('/').skip(1).collect::<Vec<&str>>().join("/");
-            let mkdir_cmd = if !remote_dir.is_empty() {
-                format!("sudo mkdir -p '{}'", remote_dir)
-            } else {
-                String::new()
-            };
-            
-            if !mkdir_cmd.is_empty() {
-                match SshClient::execute_command(&mkdir_cmd).await {
-                    Ok(_) => {
-                        add_log_and_emit(app_handle.as_ref(), &mut logs, &format!("  ✓ 目录创建成功"));
-                    }
-                    Err(e) => {
-                        add_log_and_emit(app_handle.as_ref(), &mut logs, &format!("  ⚠️ 创建目录失败: {}", e));
-                    }
+        }
+        
+        // 本地文件的 SHA-256，用于跳过内容未变化的文件
+        let local_hashes: Vec<Option<String>> = match local_hash_task {
+            Some(task) => task.await.unwrap_or_default(),
+            None => Vec::new(),
+        };
+        
+        let mut uuid_buf = [0u8; 32];
+        let staging_dir = format!(
+            "/tmp/remote_tool_deploy_{}",
+            Uuid::new_v4().simple().encode_lower(&mut uuid_buf)
+        );
+        
+        // 生成服务文件，内容变化时与其他文件一起上传到暂存目录并在安装脚本中部署
+        logger.log(&format!("创建服务文件: {}", SERVICE_FILE));
+        let service_content = build_service_unit(config.use_root);
+        
+        logger.log("生成服务文件内容...");
+        logger.log(&format!("  工作目录: {}", INSTALL_DIR));
+        logger.log(&format!("  可执行文件: {}/bin/{}", INSTALL_DIR, BINARY_NAME));
+        logger.log(&format!("  配置文件: {}/config.toml", INSTALL_DIR));
+        
+        let service_hash = format!("{:x}", Sha256::digest(service_content.as_bytes()));
+        
+        // 一次远程执行完成上传前的全部准备：创建目录、停止正在运行的服务、获取远程文件（含服务文件）哈希
+        let stop_service = status.as_ref().map_or(false, |s| s.service_running);
+        logger.log(&format!("创建目录结构: {}/bin", INSTALL_DIR));
+        if stop_service {
+            logger.log("停止现有服务...");
+        }
+        logger.log("比对远程文件哈希...");
+        let mut remote_paths: Vec<&str> = upload_files.iter().map(|f| f.remote_path.as_deref().unwrap()).collect();
+        remote_paths.push(SERVICE_FILE);
+        let prepare_cmd = build_prepare_command(&staging_dir, stop_service, &remote_paths);
+        let (remote_hashes, remote_has_gunzip) = match SshClient::execute_command(&prepare_cmd).await {
+            Ok((_, stdout, stderr)) => {
+                let has_marker = |marker: &str| stdout.lines().any(|line| line.trim() == marker);
+                if has_marker("mkdir_failed") {
+                    let filtered_stderr = filter_benign_warnings(&stderr).unwrap_or_else(|| stderr.trim().to_string());
+                    logger.log(&format!("  ⚠️ 创建目录失败: {}", filtered_stderr));
+                } else {
+                    logger.log("  ✓ 目录结构创建成功");
                 }
-            }
-            
-            // 判断文件类型，设置不同的权限
-            let is_binary = remote_path.contains("/bin/") || !remote_path.ends_with(".toml") && !remote_path.ends_with(".json");
-            let move_cmd = if is_binary {
-                format!(
-                    "sudo rm -f '{}' && sudo mv '{}' '{}' && sudo chmod +x '{}' && sudo chown root:root '{}'",
-                    remote_path, temp_remote, remote_path, remote_path, remote_path
-                )
-            } else {
-                format!(
-                    "sudo rm -f '{}' && sudo mv '{}' '{}' && sudo chmod 644 '{}'",
-                    remote_path, temp_remote, remote_path, remote_path
-                )
-            };
-            
-            match SshClient::execute_command(&move_cmd).await {
-                Ok((exit_status, stdout, stderr)) => {
-                    if exit_status == 0 {
-                        add_log_and_emit(app_handle.as_ref(), &mut logs, &format!("  ✓ 文件部署成功: {}", remote_path));
-                        if let Some(output) = filter_benign_warnings(&stdout) {
-                            add_log_and_emit(app_handle.as_ref(), &mut logs, &format!("  输出: {}", output));
+                if stop_service {
+                    if has_marker("stop_failed") {
+                        logger.log("  ⚠️ 停止服务返回非零退出码");
+                        if let Some(error) = filter_benign_warnings(&stderr) {
+                            logger.log(&format!("  错误: {}", error));
                         }
                     } else {
-                        let filtered_stderr = filter_benign_warnings(&stderr).unwrap_or_else(|| stderr.trim().to_string());
-                        let err_msg = format!("部署文件失败: 退出码 {}, 错误: {}", exit_status, filtered_stderr);
-                        add_log_and_emit(app_handle.as_ref(), &mut logs, &format!("  ✗ {}", err_msg));
-                        return Err(err_msg);
+                        logger.log("  ✓ 服务已停止");
                     }
                 }
-                Err(e) => {
-                    let err_msg = format!("部署文件失败: {}", e);
-                    add_log_and_emit(app_handle.as_ref(), &mut logs, &format!("  ✗ {}", err_msg));
-                    return Err(err_msg);
+                let has_gunzip = !has_marker("no_gunzip");
+                if !has_gunzip {
+                    logger.log("  ⚠️ 远程未安装 gunzip，大文件将不压缩直接上传");
                 }
+                (parse_remote_hashes(&stdout), has_gunzip)
             }
-        }
-    }
-    
-    // 处理文件下载
-    if !download_files.is_empty() {
-        for (idx, file) in download_files.iter().enumerate() {
+            Err(e) => {
+                logger.log(&format!("  ⚠️ 上传准备失败: {}，全部重新上传", e));
+                // 无法确认远程是否有 gunzip，按不压缩上传
+                (HashMap::new(), false)
+            }
+        };
+        
+        // 规划暂存位置，同时生成对应的安装步骤
+        let mut install_steps: Vec<String> = Vec::with_capacity(upload_files.len());
+        let mut uploads: Vec<(String, String, String, bool)> = Vec::with_capacity(upload_files.len() + 1);
+        for (idx, file) in upload_files.iter().enumerate() {
+            let local_path = file.local_path.as_ref().unwrap();
             let remote_path = file.remote_path.as_ref().unwrap();
-            let download_path = file.download_path.as_ref().unwrap();
-            
-            add_log_and_emit(app_handle.as_ref(), &mut logs, &format!("下载文件 {}/{}: {} -> {}", idx + 1, download_files.len(), remote_path, download_path));
             
-            // 检查远程文件是否存在
-            let check_cmd = format!("test -f '{}' && echo 'exists' || echo 'not_exists'", remote_path);
-            match SshClient::execute_command(&check_cmd).await {
-                Ok((_, stdout, _)) => {
-                    if stdout.trim() == "exists" {
-                        add_log_and_emit(app_handle.as_ref(), &mut logs, "  ✓ 远程文件存在");
-                    } else {
-                        let err_msg = format!("远程文件不存在: {}", remote_path);
-                        add_log_and_emit(app_handle.as_ref(), &mut logs, &format!("  ✗ {}", err_msg));
-                        return Err(err_msg);
-                    }
-                }
-                Err(e) => {
-                    add_log_and_emit(app_handle.as_ref(), &mut logs, &format!("  ⚠️ 检查远程文件失败: {}", e));
-                }
+            let local_hash = local_hashes.get(idx).cloned().flatten();
+            if local_hash.is_some() && local_hash.as_ref() == remote_hashes.get(remote_path.as_str()) {
+                logger.log(&format!("  ✓ 文件未变化，跳过上传: {}", remote_path));
+                continue;
             }
             
-            // 下载文件
-            match SshClient::download_file(remote_path, download_path).await {
-                Ok(_) => {
-                    add_log_and_emit(app_handle.as_ref(), &mut logs, &format!("  ✓ 文件下载成功: {}", download_path));
-                }
-                Err(e) => {
-                    let err_msg = format!("下载文件失败: {}", e);
-                    add_log_and_emit(app_handle.as_ref(), &mut logs, &format!("  ✗ {}", err_msg));
-                    return Err(err_msg);
-                }
-            }
-        }
-    }
-    
-    // 设置权限（仅在上传文件时设置）
-    if !upload_files.is_empty() {
-        add_log_and_emit(app_handle.as_ref(), &mut logs, "设置权限...");
-        if !config.use_root {
-            // 创建用户
-            add_log_and_emit(app_handle.as_ref(), &mut logs, &format!("创建运行用户: {}", SERVICE_USER));
-            let create_user_cmd = format!(
-                "id {} 2>/dev/null || sudo useradd -r -s /bin/false {}",
-                SERVICE_USER, SERVICE_USER
-            );
-            match SshClient::execute_command(&create_user_cmd).await {
-                Ok((exit_status, stdout, stderr)) => {
-                    if exit_status == 0 {
-                        add_log_and_emit(app_handle.as_ref(), &mut logs, &format!("  ✓ 用户 {} 已存在或创建成功", SERVICE_USER));
-                        if let Some(output) = filter_benign_warnings(&stdout) {
-                            add_log_and_emit(app_handle.as_ref(), &mut logs, &format!("  输出: {}", output));
-                        }
-                    } else {
-                        if let Some(error) = filter_benign_warnings(&stderr) {
-                            add_log_and_emit(app_handle.as_ref(), &mut logs, &format!("  ⚠️ 创建用户失败: 退出码 {}, 错误: {}", exit_status, error));
-                        }
-                    }
-                }
-                Err(e) => {
-                    add_log_and_emit(app_handle.as_ref(), &mut logs, &format!("  ⚠️ 创建用户失败: {}", e));
-                }
-            }
+            // 暂存文件名带序号，避免不同目标目录下的同名文件互相覆盖
+            let file_name = remote_path.split('/').last().unwrap_or("file");
+            let staged_remote = format!("{}/{}_{}", staging_dir, idx, file_name);
+            logger.log(&format!("  需要上传: {} (临时位置: {})", remote_path, staged_remote));
             
-            add_log_and_emit(app_handle.as_ref(), &mut logs, &format!("设置目录所有者: {}:{}", SERVICE_USER, SERVICE_USER));
-            let chown_cmd = format!(
-                "sudo chown -R {}:{} {}",
-                SERVICE_USER, SERVICE_USER, INSTALL_DIR
-            );
-            match SshClient::execute_command(&chown_cmd).await {
-                Ok((exit_status, stdout, stderr)) => {
-                    if exit_status == 0 {
-                        add_log_and_emit(app_handle.as_ref(), &mut logs, "  ✓ 权限设置成功");
-                        if let Some(output) = filter_benign_warnings(&stdout) {
-                            add_log_and_emit(app_handle.as_ref(), &mut logs, &format!("  输出: {}", output));
-                        }
-                    } else {
-                        if let Some(error) = filter_benign_warnings(&stderr) {
-                            add_log_and_emit(app_handle.as_ref(), &mut logs, &format!("  ⚠️ 权限设置失败: 退出码 {}, 错误: {}", exit_status, error));
-                        }
-                    }
-                }
-                Err(e) => {
-                    add_log_and_emit(app_handle.as_ref(), &mut logs, &format!("  ⚠️ 权限设置失败: {}", e));
-                }
+            // 远程有 gunzip 时大文件压缩后上传，安装前在远程解压回暂存位置
+            let compress = remote_has_gunzip && local_sizes[idx] >= COMPRESS_UPLOAD_MIN_SIZE;
+            if compress {
+                install_steps.push(format!(
+                    "gunzip -f {} && {}",
+                    quote_shell_single(&format!("{}.gz", staged_remote)),
+                    build_install_step(&staged_remote, remote_path)
+                ));
+                uploads.push((remote_path.clone(), local_path.clone(), format!("{}.gz", staged_remote), true));
+            } else {
+                install_steps.push(build_install_step(&staged_remote, remote_path));
+                uploads.push((remote_path.clone(), local_path.clone(), staged_remote, false));
             }
-        } else {
-            add_log_and_emit(app_handle.as_ref(), &mut logs, "使用 root 用户运行，跳过权限设置");
         }
         
-        // 创建服务文件（仅在上传文件时创建）
-        add_log_and_emit(app_handle.as_ref(), &mut logs, &format!("创建服务文件: {}", SERVICE_FILE));
-        let service_content = if config.use_root {
-            format!(
-                r#"[Unit]
-Description=Analysis Data Collector
-After=network.target
-
-[Service]
-Type=simple
-WorkingDirectory={}
-ExecStart={}/bin/{} --config {}/config.toml
-Restart=always
-RestartSec=5
-
-[Install]
-WantedBy=multi-user.target"#,
-                INSTALL_DIR, INSTALL_DIR, BINARY_NAME, INSTALL_DIR
-            )
+        let deployed_files: Vec<String> = uploads.iter().map(|(remote_path, _, _, _)| remote_path.clone()).collect();
+        
+        // 服务文件内容与远程一致时不上传，也无需重新加载 systemd
+        let staged_service = if remote_hashes.get(SERVICE_FILE) == Some(&service_hash) {
+            logger.log(&format!("  ✓ 服务文件未变化，跳过更新: {}", SERVICE_FILE));
+            None
         } else {
-            format!(
-                r#"[Unit]
-Description=Analysis Data Collector
-After=network.target
-
-[Service]
-Type=simple
-User={}
-WorkingDirectory={}
-ExecStart={}/bin/{} --config {}/config.toml
-Restart=always
-RestartSec=5
-
-[Install]
-WantedBy=multi-user.target"#,
-                SERVICE_USER, INSTALL_DIR, INSTALL_DIR, BINARY_NAME, INSTALL_DIR
-            )
+            Some(format!("{}/{}.service", staging_dir, SERVICE_NAME))
         };
         
-        add_log_and_emit(app_handle.as_ref(), &mut logs, "生成服务文件内容...");
-        add_log_and_emit(app_handle.as_ref(), &mut logs, &format!("  工作目录: {}", INSTALL_DIR));
-        add_log_and_emit(app_handle.as_ref(), &mut logs, &format!("  可执行文件: {}/bin/{}", INSTALL_DIR, BINARY_NAME));
-        add_log_and_emit(app_handle.as_ref(), &mut logs, &format!("  配置文件: {}/config.toml", INSTALL_DIR));
-        
-        // 使用 tempfile 创建跨平台临时文件
-        let temp_service_file = match NamedTempFile::new() {
-            Ok(f) => f,
+        // 所有文件共用连接上缓存的 SFTP 会话并发上传，会话内的读写请求互不阻塞
+        let upload_count = uploads.len() + usize::from(staged_service.is_some());
+        logger.log(&format!("并发上传 {} 个文件...", upload_count));
+        let sftp = match SshClient::sftp_session().await {
+            Ok(sftp) => sftp,
             Err(e) => {
-                let err_msg = format!("创建临时服务文件失败: {}", e);
-                add_log_and_emit(app_handle.as_ref(), &mut logs, &format!("  ✗ {}", err_msg));
+                let err_msg = format!("建立SFTP会话失败: {}", e);
+                logger.log(&format!("  ✗ {}", err_msg));
+                let _ = SshClient::execute_command(&format!("rm -rf {}", quote_shell_single(&staging_dir))).await;
                 return Err(err_msg);
             }
         };
-        
-        let temp_service_path = temp_service_file.path().to_string_lossy().to_string();
-        
-        match std::fs::write(&temp_service_path, &service_content) {
-            Ok(_) => {
-                add_log_and_emit(app_handle.as_ref(), &mut logs, &format!("  ✓ 临时服务文件已创建: {}", temp_service_path));
-            }
-            Err(e) => {
-                let err_msg = format!("写入临时服务文件失败: {}", e);
-                add_log_and_emit(app_handle.as_ref(), &mut logs, &format!("  ✗ {}", err_msg));
-                return Err(err_msg);
-            }
+        let mut upload_tasks = tokio::task::JoinSet::new();
+        // 服务文件内容直接从内存写入远程暂存目录
+        if let Some(service_target) = staged_service.clone() {
+            let sftp = sftp.clone();
+            upload_tasks.spawn(async move {
+                let result = SshClient::upload_bytes_with_session(&sftp, service_content.as_bytes(), &service_target).await;
+                (SERVICE_FILE.to_string(), result)
+            });
         }
-        
-        // 远程临时文件路径
-        let temp_remote = "/tmp/analysis-collector.service";
-        
-        add_log_and_emit(app_handle.as_ref(), &mut logs, "上传服务文件...");
-        match SshClient::upload_file(&temp_service_path, temp_remote).await {
-            Ok(_) => {
-                add_log_and_emit(app_handle.as_ref(), &mut logs, "  ✓ 服务文件上传成功");
-            }
-            Err(e) => {
-                let err_msg = format!("上传服务文件失败: {}", e);
-                add_log_and_emit(app_handle.as_ref(), &mut logs, &format!("  ✗ {}", err_msg));
-                return Err(err_msg);
+        for (label, local_path, staged_remote, compress) in uploads {
+            let sftp = sftp.clone();
+            upload_tasks.spawn(async move {
+                if !compress {
+                    let result = SshClient::upload_file_with_session(&sftp, &local_path, &staged_remote).await;
+                    return (label, result);
+                }
+                // 压缩在阻塞线程池中进行，与其他文件的上传并行；临时文件在上传完成后随作用域删除
+                let compressed = tokio::task::spawn_blocking(move || gzip_to_temp_file(&local_path)).await;
+                let result = match compressed {
+                    Ok(Ok(temp_file)) => {
+                        let temp_path = temp_file.path().to_string_lossy().to_string();
+                        SshClient::upload_file_with_session(&sftp, &temp_path, &staged_remote).await
+                    }
+                    Ok(Err(e)) => Err(anyhow::anyhow!("压缩文件失败: {}", e)),
+                    Err(e) => Err(anyhow::anyhow!("压缩任务异常: {}", e)),
+                };
+                (label, result)
+            });
+        }
+        let mut upload_error: Option<String> = None;
+        while let Some(joined) = upload_tasks.join_next().await {
+            match joined {
+                Ok((label, Ok(()))) => {
+                    logger.log(&format!("  ✓ 文件上传成功: {}", label));
+                }
+                Ok((label, Err(e))) => {
+                    let err_msg = format!("上传文件失败 {}: {}", label, e);
+                    logger.log(&format!("  ✗ {}", err_msg));
+                    upload_error.get_or_insert(err_msg);
+                }
+                Err(e) => {
+                    let err_msg = format!("上传任务异常: {}", e);
+                    logger.log(&format!("  ✗ {}", err_msg));
+                    upload_error.get_or_insert(err_msg);
+                }
             }
         }
+        if let Some(err_msg) = upload_error {
+            SshClient::invalidate_sftp_session();
+            let _ = SshClient::execute_command(&format!("rm -rf {}", quote_shell_single(&staging_dir))).await;
+            return Err(err_msg);
+        }
         
-        add_log_and_emit(app_handle.as_ref(), &mut logs, "部署服务文件并重新加载 systemd...");
-        let move_service_cmd = format!(
-            "sudo mv '{}' '{}' && sudo systemctl daemon-reload",
-            temp_remote, SERVICE_FILE
-        );
-        match SshClient::execute_command(&move_service_cmd).await {
+        // 一次远程执行完成文件安装、权限设置、服务文件部署与 systemd 重新加载，随后清理暂存目录
+        logger.log("部署文件、设置权限并重新加载 systemd...");
+        if config.use_root {
+            logger.log("  使用 root 用户运行，跳过权限设置");
+        } else {
+            logger.log(&format!("  运行用户与目录所有者: {}:{}", SERVICE_USER, SERVICE_USER));
+        }
+        let install_cmd = build_post_upload_command(&install_steps, staged_service.as_deref(), config.use_root, &staging_dir);
+        match SshClient::execute_command(&install_cmd).await {
             Ok((exit_status, stdout, stderr)) => {
                 if exit_status == 0 {
-                    add_log_and_emit(app_handle.as_ref(), &mut logs, &format!("  ✓ 服务文件部署成功: {}", SERVICE_FILE));
-                    add_log_and_emit(app_handle.as_ref(), &mut logs, "  ✓ systemd 已重新加载");
+                    for remote_path in &deployed_files {
+                        logger.log(&format!("  ✓ 文件部署成功: {}", remote_path));
+                    }
+                    if !config.use_root {
+                        logger.log(&format!("  ✓ 用户 {} 已存在或创建成功", SERVICE_USER));
+                        logger.log("  ✓ 权限设置成功");
+                    }
+                    if staged_service.is_some() {
+                        logger.log(&format!("  ✓ 服务文件部署成功: {}", SERVICE_FILE));
+                        logger.log("  ✓ systemd 已重新加载");
+                    }
                     if let Some(output) = filter_benign_warnings(&stdout) {
-                        add_log_and_emit(app_handle.as_ref(), &mut logs, &format!("  输出: {}", output));
+                        logger.log(&format!("  输出: {}", output));
                     }
                 } else {
                     let filtered_stderr = filter_benign_warnings(&stderr).unwrap_or_else(|| stderr.trim().to_string());
-                    let err_msg = format!("创建服务文件失败: 退出码 {}, 错误: {}", exit_status, filtered_stderr);
-                    add_log_and_emit(app_handle.as_ref(), &mut logs, &format!("  ✗ {}", err_msg));
+                    let err_msg = format!("部署文件失败: 退出码 {}, 错误: {}", exit_status, filtered_stderr);
+                    logger.log(&format!("  ✗ {}", err_msg));
                     return Err(err_msg);
                 }
             }
             Err(e) => {
-                let err_msg = format!("创建服务文件失败: {}", e);
-                add_log_and_emit(app_handle.as_ref(), &mut logs, &format!("  ✗ {}", err_msg));
+                let err_msg = format!("部署文件失败: {}", e);
+                logger.log(&format!("  ✗ {}", err_msg));
                 return Err(err_msg);
             }
         }
     }
     
+    // 处理文件下载
+    if !download_files.is_empty() {
+        // 一次远程执行检查所有待下载文件是否存在
+        logger.log("检查远程文件...");
+        let remote_paths: Vec<&str> = download_files.iter().map(|f| f.remote_path.as_deref().unwrap()).collect();
+        let exists = match SshClient::execute_command(&build_files_exist_command(&remote_paths)).await {
+            Ok((_, stdout, _)) => Some(parse_files_exist_output(&stdout)),
+            Err(e) => {
+                logger.log(&format!("  ⚠️ 检查远程文件失败: {}", e));
+                None
+            }
+        };
+        if let Some(ref exists) = exists {
+            for (idx, remote_path) in remote_paths.iter().enumerate() {
+                if exists.get(idx) != Some(&true) {
+                    let err_msg = format!("远程文件不存在: {}", remote_path);
+                    logger.log(&format!("  ✗ {}", err_msg));
+                    return Err(err_msg);
+                }
+            }
+            logger.log("  ✓ 远程文件存在");
+        }
+        
+        // 所有文件并发下载，各下载任务共用当前连接上缓存的同一个 SFTP 会话
+        logger.log(&format!("并发下载 {} 个文件...", download_files.len()));
+        let mut download_tasks = tokio::task::JoinSet::new();
+        for (idx, file) in download_files.iter().enumerate() {
+            let remote_path = file.remote_path.clone().unwrap();
+            let download_path = file.download_path.clone().unwrap();
+            
+            logger.log(&format!("下载文件 {}/{}: {} -> {}", idx + 1, download_files.len(), remote_path, download_path));
+            
+            download_tasks.spawn(async move {
+                let result = SshClient::download_file(&remote_path, &download_path).await;
+                (download_path, result)
+            });
+        }
+        let mut download_error: Option<String> = None;
+        while let Some(joined) = download_tasks.join_next().await {
+            match joined {
+                Ok((download_path, Ok(_))) => {
+                    logger.log(&format!("  ✓ 文件下载成功: {}", download_path));
+                }
+                Ok((download_path, Err(e))) => {
+                    let err_msg = format!("下载文件失败 {}: {}", download_path, e);
+                    logger.log(&format!("  ✗ {}", err_msg));
+                    download_error.get_or_insert(err_msg);
+                }
+                Err(e) => {
+                    let err_msg = format!("下载任务异常: {}", e);
+                    logger.log(&format!("  ✗ {}", err_msg));
+                    download_error.get_or_insert(err_msg);
+                }
+            }
+        }
+        if let Some(err_msg) = download_error {
+            return Err(err_msg);
+        }
+    }
+    
     // 处理服务重启
     if config.restart_service {
         // 获取服务状态用于重启
@@ -661,138 +762,209 @@ WantedBy=multi-user.target"#,
             s.service_running
         } else {
             // 如果没有状态，重新检查
-            add_log_and_emit(app_handle.as_ref(), &mut logs, "检查服务状态...");
+            logger.log("检查服务状态...");
             match check_deploy_status().await {
                 Ok(s) => {
-                    add_log_and_emit(app_handle.as_ref(), &mut logs, &format!("  服务状态: {}", if s.service_running { "运行中" } else { "未运行" }));
+                    logger.log(&format!("  服务状态: {}", if s.service_running { "运行中" } else { "未运行" }));
                     s.service_running
                 }
                 Err(e) => {
-                    add_log_and_emit(app_handle.as_ref(), &mut logs, &format!("  ⚠️ 检查服务状态失败: {}，尝试直接重启服务", e));
-                    // 直接尝试重启服务
-                    add_log_and_emit(app_handle.as_ref(), &mut logs, "重启服务...");
-                    let restart_cmd = format!("sudo systemctl restart {}", SERVICE_NAME);
-                    match SshClient::execute_command(&restart_cmd).await {
-                        Ok((exit_status, stdout, stderr)) => {
-                            if exit_status == 0 {
-                                add_log_and_emit(app_handle.as_ref(), &mut logs, "  ✓ 服务已重启");
-                                if let Some(output) = filter_benign_warnings(&stdout) {
-                                    add_log_and_emit(app_handle.as_ref(), &mut logs, &format!("  输出: {}", output));
-                                }
-                            } else {
-                                let filtered_stderr = filter_benign_warnings(&stderr).unwrap_or_else(|| stderr.trim().to_string());
-                                let err_msg = format!("重启服务失败: 退出码 {}, 错误: {}", exit_status, filtered_stderr);
-                                add_log_and_emit(app_handle.as_ref(), &mut logs, &format!("  ✗ {}", err_msg));
-                                return Err(err_msg);
-                            }
-                        }
-                        Err(e) => {
-                            let err_msg = format!("重启服务失败: {}", e);
-                            add_log_and_emit(app_handle.as_ref(), &mut logs, &format!("  ✗ {}", err_msg));
-                            return Err(err_msg);
-                        }
-                    }
-                    add_log_and_emit(app_handle.as_ref(), &mut logs, "=========================================");
-                    add_log_and_emit(app_handle.as_ref(), &mut logs, "重启服务完成！");
-                    add_log_and_emit(app_handle.as_ref(), &mut logs, "=========================================");
-                    return Ok(logs);
+                    // 状态未知时按重启处理，systemctl restart 对未运行的服务同样会启动
+                    logger.log(&format!("  ⚠️ 检查服务状态失败: {}，尝试直接重启服务", e));
+                    true
                 }
             }
         };
         
-        if service_running {
-            // 服务正在运行，执行重启
-            add_log_and_emit(app_handle.as_ref(), &mut logs, "重启服务...");
-            let restart_cmd = format!("sudo systemctl restart {}", SERVICE_NAME);
-            match SshClient::execute_command(&restart_cmd).await {
-                Ok((exit_status, stdout, stderr)) => {
-                    if exit_status == 0 {
-                        add_log_and_emit(app_handle.as_ref(), &mut logs, "  ✓ 服务已重启");
-                        if let Some(output) = filter_benign_warnings(&stdout) {
-                            add_log_and_emit(app_handle.as_ref(), &mut logs, &format!("  输出: {}", output));
-                        }
-                    } else {
-                        let filtered_stderr = filter_benign_warnings(&stderr).unwrap_or_else(|| stderr.trim().to_string());
-                        let err_msg = format!("重启服务失败: 退出码 {}, 错误: {}", exit_status, filtered_stderr);
-                        add_log_and_emit(app_handle.as_ref(), &mut logs, &format!("  ✗ {}", err_msg));
-                        return Err(err_msg);
-                    }
-                }
-                Err(e) => {
-                    let err_msg = format!("重启服务失败: {}", e);
-                    add_log_and_emit(app_handle.as_ref(), &mut logs, &format!("  ✗ {}", err_msg));
-                    return Err(err_msg);
-                }
-            }
-        } else {
-            // 服务未运行，执行启动
-            add_log_and_emit(app_handle.as_ref(), &mut logs, "启动服务...");
-            let start_cmd = format!("sudo systemctl start {}", SERVICE_NAME);
-            match SshClient::execute_command(&start_cmd).await {
-                Ok((exit_status, stdout, stderr)) => {
-                    if exit_status == 0 {
-                        add_log_and_emit(app_handle.as_ref(), &mut logs, "  ✓ 服务已启动");
-                        if let Some(output) = filter_benign_warnings(&stdout) {
-                            add_log_and_emit(app_handle.as_ref(), &mut logs, &format!("  输出: {}", output));
-                        }
-                    } else {
-                        let filtered_stderr = filter_benign_warnings(&stderr).unwrap_or_else(|| stderr.trim().to_string());
-                        let err_msg = format!("启动服务失败: 退出码 {}, 错误: {}", exit_status, filtered_stderr);
-                        add_log_and_emit(app_handle.as_ref(), &mut logs, &format!("  ✗ {}", err_msg));
-                        return Err(err_msg);
-                    }
-                }
-                Err(e) => {
-                    let err_msg = format!("启动服务失败: {}", e);
-                    add_log_and_emit(app_handle.as_ref(), &mut logs, &format!("  ✗ {}", err_msg));
+        // 一次远程执行完成 启动/重启、启用、等待就绪并获取状态详情
+        let (action, done_msg) = if service_running { ("重启", "  ✓ 服务已重启") } else { ("启动", "  ✓ 服务已启动") };
+        logger.log(&format!("{}并启用服务...", action));
+        match SshClient::execute_command(&build_start_service_command(service_running)).await {
+            Ok((exit_status, stdout, stderr)) => {
+                if exit_status != 0 {
+                    let filtered_stderr = filter_benign_warnings(&stderr).unwrap_or_else(|| stderr.trim().to_string());
+                    let err_msg = format!("{}服务失败: 退出码 {}, 错误: {}", action, exit_status, filtered_stderr);
+                    logger.log(&format!("  ✗ {}", err_msg));
                     return Err(err_msg);
                 }
-            }
-        }
-        
-        // 启用服务
-        add_log_and_emit(app_handle.as_ref(), &mut logs, "启用服务...");
-        let enable_cmd = format!("sudo systemctl enable {}", SERVICE_NAME);
-        match SshClient::execute_command(&enable_cmd).await {
-            Ok((exit_status, stdout, stderr)) => {
-                if exit_status == 0 {
-                    add_log_and_emit(app_handle.as_ref(), &mut logs, "  ✓ 服务已启用");
-                    if let Some(output) = filter_benign_warnings(&stdout) {
-                        add_log_and_emit(app_handle.as_ref(), &mut logs, &format!("  输出: {}", output));
-                    }
+                logger.log(done_msg);
+                logger.log("  ✓ 服务已启用");
+                
+                // 验证服务状态：远程已按退避间隔轮询直到服务进入 active
+                logger.log("验证服务状态...");
+                let (active, status_output) = parse_wait_active_output(&stdout);
+                if active == "active" {
+                    logger.log("  ✓ 服务已进入运行状态");
                 } else {
-                    if let Some(error) = filter_benign_warnings(&stderr) {
-                        add_log_and_emit(app_handle.as_ref(), &mut logs, &format!("  ⚠️ 启用服务失败: 退出码 {}, 错误: {}", exit_status, error));
-                    }
+                    logger.log(&format!("  ⚠️ 等待服务就绪超时，当前状态: {}", if active.is_empty() { "unknown" } else { active }));
                 }
-            }
-            Err(e) => {
-                add_log_and_emit(app_handle.as_ref(), &mut logs, &format!("  ⚠️ 启用服务失败: {}", e));
-            }
-        }
-        
-        // 验证服务状态
-        add_log_and_emit(app_handle.as_ref(), &mut logs, "验证服务状态...");
-        let status_cmd = format!("sudo systemctl status {} --no-pager -l", SERVICE_NAME);
-        match SshClient::execute_command(&status_cmd).await {
-            Ok((_, status_output, _)) => {
-                if let Some(output) = filter_benign_warnings(&status_output) {
+                if let Some(output) = filter_benign_warnings(status_output) {
                     let status_lines: Vec<&str> = output.lines().take(3).collect();
                     for line in status_lines {
                         if !line.trim().is_empty() {
-                            add_log_and_emit(app_handle.as_ref(), &mut logs, &format!("  {}", line));
+                            logger.log(&format!("  {}", line));
                         }
                     }
                 }
             }
-            Err(_) => {}
+            Err(e) => {
+                let err_msg = format!("{}服务失败: {}", action, e);
+                logger.log(&format!("  ✗ {}", err_msg));
+                return Err(err_msg);
+            }
         }
     }
     
-    add_log_and_emit(app_handle.as_ref(), &mut logs, "=========================================");
-    add_log_and_emit(app_handle.as_ref(), &mut logs, &format!("{}完成！", operation_type));
-    add_log_and_emit(app_handle.as_ref(), &mut logs, "=========================================");
+    logger.log("=========================================");
+    logger.log(&format!("{}完成！", operation_type));
+    logger.log("=========================================");
     
-    Ok(logs)
+    Ok(logger.into_logs())
 }
 
+
+#[cfg(test)]
+mod tests {
+    use super::{
+        build_files_exist_command, build_install_step, build_post_upload_command,
+        build_prepare_command, build_remote_hash_command, build_service_unit,
+        build_start_service_command, build_status_check_command, build_wait_active_command,
+        filter_benign_warnings, parse_deploy_status, parse_files_exist_output, parse_remote_hashes,
+        parse_wait_active_output,
+    };
+
+    #[test]
+    fn should_check_files_exist_in_single_command() {
+        assert_eq!(
+            build_files_exist_command(&["/opt/analysis/config.toml", "/opt/a b.json"]),
+            "for f in '/opt/analysis/config.toml' '/opt/a b.json'; do if test -f \"$f\"; then echo 1; else echo 0; fi; done"
+        );
+        assert_eq!(parse_files_exist_output("1\n0\n"), vec![true, false]);
+    }
+
+    #[test]
+    fn should_build_wait_active_command() {
+        assert_eq!(
+            build_wait_active_command(),
+            "for d in 0.1 0.2 0.4 0.8 1 1; do systemctl is-active --quiet ancol && break; sleep $d; done; echo \"active=$(systemctl is-active ancol 2>/dev/null)\"; sudo systemctl status ancol --no-pager -l"
+        );
+    }
+
+    #[test]
+    fn should_build_start_service_command() {
+        let cmd = build_start_service_command(false);
+        assert!(cmd.starts_with("sudo systemctl enable --now ancol; rc=$?; if [ $rc -eq 0 ]; then for d in"));
+        assert!(cmd.ends_with("--no-pager -l; fi; exit $rc"));
+
+        let cmd = build_start_service_command(true);
+        assert!(cmd.starts_with("sudo systemctl restart ancol && sudo systemctl enable ancol; rc=$?;"));
+    }
+
+    #[test]
+    fn should_parse_wait_active_output() {
+        let (active, status) = parse_wait_active_output("active=active\n● ancol.service - Analysis\n   Active: active (running)\n");
+        assert_eq!(active, "active");
+        assert!(status.starts_with("● ancol.service"));
+
+        assert_eq!(parse_wait_active_output("active=failed").0, "failed");
+        assert_eq!(parse_wait_active_output("unexpected"), ("", "unexpected"));
+    }
+
+    #[test]
+    fn should_build_prepare_command() {
+        let cmd = build_prepare_command("/tmp/stage", true, &["/opt/analysis/bin/ancol"]);
+        assert_eq!(
+            cmd,
+            "{ mkdir -p '/tmp/stage' && sudo mkdir -p /opt/analysis/bin; } || echo mkdir_failed; sudo systemctl stop ancol || echo stop_failed; command -v gunzip >/dev/null 2>&1 || echo no_gunzip; sudo sha256sum '/opt/analysis/bin/ancol' 2>/dev/null; true"
+        );
+        assert!(!build_prepare_command("/tmp/stage", false, &["/opt/analysis/bin/ancol"]).contains("systemctl stop"));
+    }
+
+    #[test]
+    fn should_build_remote_hash_command() {
+        assert_eq!(
+            build_remote_hash_command(&["/opt/analysis/bin/ancol", "/opt/analysis/config.toml"]),
+            "sudo sha256sum '/opt/analysis/bin/ancol' '/opt/analysis/config.toml' 2>/dev/null; true"
+        );
+    }
+
+    #[test]
+    fn should_parse_remote_hashes() {
+        let hash = "ab".repeat(32);
+        let output = format!("{}  /opt/analysis/bin/ancol\nsudo: unable to resolve host x\n", hash);
+        let hashes = parse_remote_hashes(&output);
+        assert_eq!(hashes.len(), 1);
+        assert_eq!(hashes.get("/opt/analysis/bin/ancol"), Some(&hash));
+    }
+
+    #[test]
+    fn should_build_service_unit_with_optional_user() {
+        assert!(build_service_unit(false).contains("Type=simple\nUser=analysis\nWorkingDirectory=/opt/analysis\n"));
+        assert!(build_service_unit(true).contains("Type=simple\nWorkingDirectory=/opt/analysis\n"));
+        assert!(build_service_unit(true).contains("ExecStart=/opt/analysis/bin/ancol --config /opt/analysis/config.toml"));
+    }
+
+    #[test]
+    fn should_build_post_upload_command_in_one_script() {
+        let steps = vec!["step_a".to_string(), "step_b".to_string()];
+        let cmd = build_post_upload_command(&steps, Some("/tmp/stage/ancol.service"), false, "/tmp/stage");
+        assert_eq!(
+            cmd,
+            "{ step_a && step_b && { id analysis >/dev/null 2>&1 || sudo useradd -r -s /bin/false analysis; } && sudo find /opt/analysis \\( ! -user analysis -o ! -group analysis \\) -exec chown -h analysis:analysis {} + && sudo mv '/tmp/stage/ancol.service' /etc/systemd/system/ancol.service && sudo systemctl daemon-reload; }; rc=$?; rm -rf '/tmp/stage'; exit $rc"
+        );
+
+        let cmd = build_post_upload_command(&steps, Some("/tmp/stage/ancol.service"), true, "/tmp/stage");
+        assert!(!cmd.contains("useradd") && !cmd.contains("chown"));
+
+        let cmd = build_post_upload_command(&steps, None, true, "/tmp/stage");
+        assert!(!cmd.contains("daemon-reload"));
+
+        let cmd = build_post_upload_command(&[], None, true, "/tmp/stage");
+        assert!(cmd.starts_with("{ true; };"));
+    }
+
+    #[test]
+    fn should_check_status_in_single_command() {
+        let cmd = build_status_check_command();
+        assert!(cmd.contains("test -f /opt/analysis/bin/ancol"));
+        assert!(cmd.contains("sudo test -f /etc/systemd/system/ancol.service"));
+        assert!(cmd.contains("systemctl is-active ancol"));
+        assert!(cmd.contains("systemctl is-enabled ancol"));
+    }
+
+    #[test]
+    fn should_parse_deploy_status() {
+        let status = parse_deploy_status("installed=1\nservice_exists=1\nactive=active\nenabled=enabled\n");
+        assert!(status.installed && status.service_exists && status.service_running && status.service_enabled);
+
+        let status = parse_deploy_status("installed=1\nservice_exists=1\nactive=inactive\nenabled=disabled\n");
+        assert!(!status.service_running && !status.service_enabled);
+
+        let status = parse_deploy_status("installed=0\nservice_exists=0\nactive=active\nenabled=enabled\n");
+        assert!(!status.installed && !status.service_running && !status.service_enabled);
+    }
+
+    #[test]
+    fn should_build_install_step_for_binary() {
+        let step = build_install_step("/tmp/stage/0_ancol", "/opt/analysis/bin/ancol");
+        assert_eq!(
+            step,
+            "sudo mkdir -p '/opt/analysis/bin' && sudo rm -f '/opt/analysis/bin/ancol' && sudo mv '/tmp/stage/0_ancol' '/opt/analysis/bin/ancol' && sudo chmod +x '/opt/analysis/bin/ancol' && sudo chown root:root '/opt/analysis/bin/ancol'"
+        );
+    }
+
+    #[test]
+    fn should_build_install_step_for_config() {
+        let step = build_install_step("/tmp/stage/1_config.toml", "/opt/analysis/config.toml");
+        assert!(step.ends_with("sudo chmod 644 '/opt/analysis/config.toml'"));
+        assert!(!step.contains("chown"));
+    }
+
+    #[test]
+    fn should_filter_benign_sudo_warnings() {
+        assert_eq!(filter_benign_warnings("sudo: unable to resolve host node1: Name or service not known\n"), None);
+        assert_eq!(filter_benign_warnings("Sudo: Unable To Resolve Hostname node1"), None);
+        assert_eq!(filter_benign_warnings("  \n"), None);
+        assert_eq!(filter_benign_warnings(" 权限不足 \n").as_deref(), Some("权限不足"));
+    }
+}
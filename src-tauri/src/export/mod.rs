@@ -1,104 +1,335 @@
 use csv::Writer;
 use serde_json::Value;
-use chrono::{Utc, TimeZone, FixedOffset};
+use chrono::{Datelike, FixedOffset, TimeZone, Timelike, Utc};
+use std::borrow::Cow;
 
-// 格式化时间戳（东八区）
-fn format_timestamp(timestamp: i64, is_millis: bool) -> String {
-    let dt = if is_millis {
-        Utc.timestamp_opt(timestamp / 1000, ((timestamp % 1000) * 1_000_000) as u32)
-            .single()
-    } else {
-        Utc.timestamp_opt(timestamp, 0).single()
-    };
-    
-    match dt {
-        Some(dt) => {
-            let beijing_tz = FixedOffset::east_opt(8 * 3600).unwrap();
-            let beijing_dt = dt.with_timezone(&beijing_tz);
-            if is_millis {
-                format!("{}.{:03}", beijing_dt.format("%Y/%m/%d %H:%M:%S"), timestamp % 1000)
+/// 东八区（北京时间）时区，编译期常量，各模块共用，避免每次调用重新构造
+pub(crate) const BEIJING_TZ: FixedOffset = match FixedOffset::east_opt(8 * 3600) {
+    Some(tz) => tz,
+    None => panic!("invalid timezone offset"),
+};
+
+/// 东八区时间戳格式化器
+///
+/// 时序数据相邻行的时间戳大多落在同一秒内，这里缓存上一次格式化的秒级结果，
+/// 命中时直接复用；秒数变化时按固定布局手工拼接数字，不经过 chrono 的格式串解析。
+/// 输出形如 `{prefix}YYYY{sep}MM{sep}DD HH:MM:SS`。
+pub(crate) struct TimestampFormatter {
+    prefix: &'static str,
+    date_sep: char,
+    last_secs: Option<i64>,
+    cached: String,
+}
+
+impl TimestampFormatter {
+    /// prefix 为前导文本（如防止 Excel 自动转换的单引号），date_sep 为日期分隔符（'-' 或 '/'）
+    pub(crate) fn new(prefix: &'static str, date_sep: char) -> Self {
+        Self {
+            prefix,
+            date_sep,
+            last_secs: None,
+            cached: String::with_capacity(32),
+        }
+    }
+
+    /// 格式化秒级时间戳，时间戳无效时返回 None
+    pub(crate) fn format_secs(&mut self, secs: i64) -> Option<&str> {
+        if self.last_secs != Some(secs) {
+            let dt = Utc.timestamp_opt(secs, 0).single()?.with_timezone(&BEIJING_TZ);
+            let out = &mut self.cached;
+            out.clear();
+            out.push_str(self.prefix);
+            let year = dt.year();
+            if (0..=9999).contains(&year) {
+                push_digits(out, year as u32, 4);
             } else {
-                beijing_dt.format("%Y-%m-%d %H:%M:%S").to_string()
+                use std::fmt::Write;
+                let _ = write!(out, "{}", year);
             }
+            out.push(self.date_sep);
+            push_digits(out, dt.month(), 2);
+            out.push(self.date_sep);
+            push_digits(out, dt.day(), 2);
+            out.push(' ');
+            push_digits(out, dt.hour(), 2);
+            out.push(':');
+            push_digits(out, dt.minute(), 2);
+            out.push(':');
+            push_digits(out, dt.second(), 2);
+            self.last_secs = Some(secs);
         }
-        None => timestamp.to_string(),
+        Some(&self.cached)
+    }
+
+    /// 将毫秒级时间戳格式化后追加到 out（调用方可复用缓冲区），时间戳无效时返回 false
+    pub(crate) fn write_millis(&mut self, millis: i64, out: &mut String) -> bool {
+        let ms = millis.rem_euclid(1000) as u32;
+        match self.format_secs(millis.div_euclid(1000)) {
+            Some(s) => {
+                out.push_str(s);
+                out.push('.');
+                push_digits(out, ms, 3);
+                true
+            }
+            None => false,
+        }
+    }
+}
+
+/// 以固定宽度（左侧补零）追加十进制数字
+fn push_digits(out: &mut String, value: u32, width: u32) {
+    let mut divisor = 10u32.pow(width - 1);
+    while divisor > 0 {
+        out.push(char::from(b'0' + (value / divisor % 10) as u8));
+        divisor /= 10;
     }
 }
 
-// 格式化值
-fn format_value(value: Option<&Value>) -> String {
+// 格式化值（字符串和布尔值直接借用，避免逐格分配）
+fn format_value(value: Option<&Value>) -> Cow<'_, str> {
     match value {
-        None => String::new(),
-        Some(Value::Null) => String::new(),
-        Some(Value::String(s)) => s.clone(),
-        Some(Value::Number(n)) => n.to_string(),
-        Some(Value::Bool(b)) => b.to_string(),
-        Some(Value::Array(a)) => serde_json::to_string(a).unwrap_or_default(),
-        Some(Value::Object(o)) => serde_json::to_string(o).unwrap_or_default(),
+        None | Some(Value::Null) => Cow::Borrowed(""),
+        Some(Value::String(s)) => Cow::Borrowed(s.as_str()),
+        Some(Value::Number(n)) => Cow::Owned(n.to_string()),
+        Some(Value::Bool(b)) => Cow::Borrowed(if *b { "true" } else { "false" }),
+        Some(Value::Array(a)) => Cow::Owned(serde_json::to_string(a).unwrap_or_default()),
+        Some(Value::Object(o)) => Cow::Owned(serde_json::to_string(o).unwrap_or_default()),
+    }
+}
+
+/// CSV 写入缓冲区大小（1 MiB），大文件导出时减少 write 系统调用次数
+const CSV_BUFFER_CAPACITY: usize = 1 << 20;
+
+/// 后台落盘的文件写入器
+///
+/// 格式化线程把 CSV 写入器刷出的整块数据交给独立的写线程，
+/// 数据格式化与磁盘写入在两个线程上并行，慢速磁盘不再阻塞查询遍历。
+pub(crate) struct BackgroundFileWriter {
+    tx: Option<std::sync::mpsc::SyncSender<Vec<u8>>>,
+    handle: Option<std::thread::JoinHandle<std::io::Result<()>>>,
+}
+
+impl BackgroundFileWriter {
+    fn new(file: std::fs::File) -> Self {
+        use std::io::Write;
+        // 有界队列：最多积压 4 块（约 4 MiB），写盘跟不上时由格式化线程等待
+        let (tx, rx) = std::sync::mpsc::sync_channel::<Vec<u8>>(4);
+        let handle = std::thread::spawn(move || -> std::io::Result<()> {
+            let mut file = file;
+            for chunk in rx {
+                file.write_all(&chunk)?;
+            }
+            file.flush()
+        });
+        Self {
+            tx: Some(tx),
+            handle: Some(handle),
+        }
+    }
+
+    /// 等待后台写线程结束并取回其结果
+    fn join(&mut self) -> std::io::Result<()> {
+        match self.handle.take() {
+            Some(handle) => handle.join().unwrap_or_else(|_| {
+                Err(std::io::Error::new(std::io::ErrorKind::Other, "后台写文件线程异常退出"))
+            }),
+            None => Ok(()),
+        }
+    }
+
+    /// 结束写入：关闭队列并等待剩余数据全部落盘
+    pub(crate) fn finish(mut self) -> std::io::Result<()> {
+        self.tx.take();
+        self.join()
+    }
+}
+
+impl std::io::Write for BackgroundFileWriter {
+    fn write(&mut self, buf: &[u8]) -> std::io::Result<usize> {
+        let sent = match self.tx.as_ref() {
+            Some(tx) => tx.send(buf.to_vec()).is_ok(),
+            None => false,
+        };
+        if sent {
+            return Ok(buf.len());
+        }
+        // 写线程已退出（写盘失败），取回它的错误
+        self.tx.take();
+        self.join()?;
+        Err(std::io::Error::new(std::io::ErrorKind::BrokenPipe, "后台写文件线程已退出"))
+    }
+
+    fn flush(&mut self) -> std::io::Result<()> {
+        // 落盘由 finish 统一等待
+        Ok(())
     }
 }
 
+/// 创建 CSV 写入器：单次打开文件并写入 UTF-8 BOM（Excel 识别编码），
+/// 写入器自带 1 MiB 缓冲区，整块交给后台线程写盘
+pub(crate) fn create_csv_writer(
+    output_path: &str,
+    quote_style: csv::QuoteStyle,
+) -> std::io::Result<Writer<BackgroundFileWriter>> {
+    use std::io::Write;
+    let mut file = std::fs::File::create(output_path)?;
+    file.write_all(&[0xEF, 0xBB, 0xBF])?;
+    Ok(csv::WriterBuilder::new()
+        .quote_style(quote_style)
+        .buffer_capacity(CSV_BUFFER_CAPACITY)
+        .from_writer(BackgroundFileWriter::new(file)))
+}
+
+/// 刷出 CSV 写入器剩余数据，并等待后台线程写盘完成
+pub(crate) fn finish_csv_writer(wtr: Writer<BackgroundFileWriter>) -> std::io::Result<()> {
+    wtr.into_inner().map_err(|e| e.into_error())?.finish()
+}
+
+// 写入单个值：数值经复用缓冲区格式化，避免逐格分配字符串
+fn write_value<W: std::io::Write>(
+    wtr: &mut Writer<W>,
+    value: Option<&Value>,
+    scratch: &mut String,
+) -> csv::Result<()> {
+    if let Some(Value::Number(n)) = value {
+        use std::fmt::Write;
+        scratch.clear();
+        let _ = write!(scratch, "{}", n);
+        return wtr.write_field(scratch.as_bytes());
+    }
+    wtr.write_field(format_value(value).as_bytes())
+}
+
 // 主导出函数（从内存数据直接导出到CSV文件，仅支持宽表）
 pub async fn export_to_csv(
     data: crate::query::QueryResult,
     output_path: String,
     _query_type: Option<String>,
 ) -> Result<(), String> {
-    // 只支持宽表导出
-    export_wide_table_from_memory(&data, &output_path).await
+    // 只支持宽表导出；结果按值交给导出函数，逐行写出后即释放。
+    // 格式化与写入是纯 CPU/阻塞 IO，放到阻塞线程池执行，不占用异步运行时的工作线程
+    tokio::task::spawn_blocking(move || export_wide_table_from_memory(data, &output_path))
+        .await
+        .map_err(|e| format!("Export thread failed: {}", e))?
 }
 
-// 从内存数据导出宽表：格式化local_timestamp、保持原始列顺序
-async fn export_wide_table_from_memory(
-    data: &crate::query::QueryResult,
+// 从内存数据导出宽表：格式化local_timestamp、保持原始列顺序。
+// 行数据按值消费，每行写入 CSV 缓冲区后立即释放，导出过程中内存随进度逐步回落
+fn export_wide_table_from_memory(
+    data: crate::query::QueryResult,
     output_path: &str,
 ) -> Result<(), String> {
-    use std::io::Write;
-    
-    // 创建输出文件并写入UTF-8 BOM
-    let mut file = std::fs::File::create(output_path)
+    // 创建输出文件（含UTF-8 BOM）和CSV写入器
+    let mut wtr = create_csv_writer(output_path, csv::QuoteStyle::Necessary)
         .map_err(|e| format!("Failed to create output file: {}", e))?;
     
-    file.write_all(&[0xEF, 0xBB, 0xBF])
-        .map_err(|e| format!("Failed to write BOM: {}", e))?;
-    
-    // 创建CSV写入器
-    let mut wtr = Writer::from_writer(file);
-    
     // 写入表头（保持原始顺序）
     wtr.write_record(&data.columns)
         .map_err(|e| format!("Failed to write header: {}", e))?;
     
-    // 写入数据行（格式化local_timestamp字段）
-    for row in &data.rows {
-        if let Some(obj) = row.as_object() {
-            let mut record = Vec::new();
-            for col in &data.columns {
-                let value = obj.get(col);
-                let formatted_value = if col == "local_timestamp" {
-                    if let Some(v) = value {
-                        if let Some(ts) = v.as_i64() {
-                            format_timestamp(ts, true)
-                        } else {
-                            format_value(value)
+    // 列处理计划：每列是否为时间戳列只在这里判断一次，内层循环不再逐格比较列名
+    let plan: Vec<bool> = data
+        .columns
+        .iter()
+        .map(|col| col == "local_timestamp")
+        .collect();
+    
+    let mut ts_formatter = TimestampFormatter::new("", '/');
+    // 数值与时间戳字段共用的格式化缓冲区，整个导出过程只分配一次
+    let mut scratch = String::with_capacity(64);
+    
+    if !plan.contains(&true) {
+        // 快速路径：没有需要格式化的列时整行直接写出，跳过逐格的时间戳判断
+        for row in data.rows {
+            for i in 0..plan.len() {
+                write_value(&mut wtr, row.get(i), &mut scratch)
+                    .map_err(|e| format!("Failed to write field: {}", e))?;
+            }
+            
+            wtr.write_record(None::<&[u8]>)
+                .map_err(|e| format!("Failed to write record: {}", e))?;
+        }
+    } else {
+        // 写入数据行（格式化local_timestamp字段）
+        // 逐字段直接写入CSV写入器，不再为每行构造中间 Vec<String>
+        // 行数据按列位置存放，直接按下标取值
+        for row in data.rows {
+            for (i, &is_timestamp) in plan.iter().enumerate() {
+                let value = row.get(i);
+                if is_timestamp {
+                    if let Some(ts) = value.and_then(Value::as_i64) {
+                        scratch.clear();
+                        if !ts_formatter.write_millis(ts, &mut scratch) {
+                            use std::fmt::Write;
+                            scratch.clear();
+                            let _ = write!(scratch, "{}", ts);
                         }
-                    } else {
-                        String::new()
+                        wtr.write_field(scratch.as_bytes())
+                            .map_err(|e| format!("Failed to write field: {}", e))?;
+                        continue;
                     }
-                } else {
-                    format_value(value)
-                };
-                record.push(formatted_value);
+                }
+                write_value(&mut wtr, value, &mut scratch)
+                    .map_err(|e| format!("Failed to write field: {}", e))?;
             }
             
-            wtr.write_record(&record)
+            wtr.write_record(None::<&[u8]>)
                 .map_err(|e| format!("Failed to write record: {}", e))?;
         }
     }
     
-    wtr.flush()
+    finish_csv_writer(wtr)
         .map_err(|e| format!("Failed to flush CSV file: {}", e))?;
     
     Ok(())
 }
 
+
+#[cfg(test)]
+mod tests {
+    use super::*;
+
+    #[test]
+    fn should_format_millis_in_beijing_time() {
+        let mut formatter = TimestampFormatter::new("", '/');
+        let mut out = String::new();
+        assert!(formatter.write_millis(1_700_000_000_123, &mut out));
+        assert_eq!(out, "2023/11/15 06:13:20.123");
+    }
+
+    #[test]
+    fn should_reuse_cached_second_for_same_timestamp() {
+        let mut formatter = TimestampFormatter::new("'", '-');
+        assert_eq!(formatter.format_secs(1_700_000_000), Some("'2023-11-15 06:13:20"));
+        assert_eq!(formatter.format_secs(1_700_000_000), Some("'2023-11-15 06:13:20"));
+        assert_eq!(formatter.format_secs(1_700_000_001), Some("'2023-11-15 06:13:21"));
+    }
+
+    #[test]
+    fn should_pad_fields_with_zeros() {
+        let mut formatter = TimestampFormatter::new("", '-');
+        // 2024-01-02 03:04:05 (GMT+8)
+        assert_eq!(formatter.format_secs(1_704_135_845), Some("2024-01-02 03:04:05"));
+        let mut out = String::new();
+        assert!(formatter.write_millis(1_704_135_845_007, &mut out));
+        assert_eq!(out, "2024-01-02 03:04:05.007");
+    }
+
+    #[test]
+    fn should_write_all_chunks_in_background() {
+        use std::io::Write;
+        let path = std::env::temp_dir()
+            .join(format!("remote_tool_bg_writer_{}.txt", std::process::id()));
+        let file = std::fs::File::create(&path).unwrap();
+        let mut writer = BackgroundFileWriter::new(file);
+        for i in 0..100 {
+            writeln!(writer, "line{}", i).unwrap();
+        }
+        writer.finish().unwrap();
+
+        let content = std::fs::read_to_string(&path).unwrap();
+        let _ = std::fs::remove_file(&path);
+        assert_eq!(content.lines().count(), 100);
+        assert!(content.ends_with("line99\n"));
+    }
+}
@@ -1,10 +1,13 @@
-use crate::ssh::SshClient;
+use crate::export::{create_csv_writer, finish_csv_writer, TimestampFormatter, BEIJING_TZ};
+use crate::ssh::{quote_shell_single, SshClient};
 use serde::{Deserialize, Serialize};
-use chrono::{Utc, FixedOffset, TimeZone};
+use chrono::{Utc, TimeZone};
 use std::collections::HashMap;
-use std::path::{Path, PathBuf};
-use std::sync::{Mutex, OnceLock};
+use std::path::Path;
+use std::sync::{Arc, Mutex, OnceLock};
 use rusqlite::OpenFlags;
+use rusqlite::types::ValueRef;
+use tauri::Emitter;
 use uuid::Uuid;
 
 // ============================================================
@@ -26,6 +29,60 @@ fn db_cache() -> &'static Mutex<HashMap<String, CachedDb>> {
     CACHE.get_or_init(|| Mutex::new(HashMap::new()))
 }
 
+/// 已通过结构校验的本地数据库：path -> (修改时间, 文件大小)
+/// 文件未变化时直接复用上次的校验结果，不再重新打开数据库读取 sqlite_master
+fn validated_db_cache() -> &'static Mutex<HashMap<String, FileFingerprint>> {
+    static CACHE: OnceLock<Mutex<HashMap<String, FileFingerprint>>> = OnceLock::new();
+    CACHE.get_or_init(|| Mutex::new(HashMap::new()))
+}
+
+/// 本地只读连接缓存：path -> (文件指纹, 连接)
+/// 连接在多次查询/导出间复用，省去重复打开文件和解析表结构；表结构变化由 SQLite 按
+/// schema_version 自动检测。文件指纹（修改时间 + 大小）变化说明文件被替换，此时重新打开。
+fn read_conn_cache() -> &'static Mutex<HashMap<String, (FileFingerprint, Arc<Mutex<rusqlite::Connection>>)>> {
+    static CACHE: OnceLock<Mutex<HashMap<String, (FileFingerprint, Arc<Mutex<rusqlite::Connection>>)>>> = OnceLock::new();
+    CACHE.get_or_init(|| Mutex::new(HashMap::new()))
+}
+
+/// 文件指纹：(修改时间, 文件大小)
+type FileFingerprint = (std::time::SystemTime, u64);
+
+fn file_fingerprint(path: &str) -> Option<FileFingerprint> {
+    let metadata = std::fs::metadata(path).ok()?;
+    Some((metadata.modified().ok()?, metadata.len()))
+}
+
+/// 获取（或打开并缓存）本地数据库的只读连接，在阻塞线程中使用
+fn cached_read_connection(path: &str) -> Result<Arc<Mutex<rusqlite::Connection>>, String> {
+    let fingerprint = file_fingerprint(path);
+    let mut cache = read_conn_cache().lock().unwrap();
+    if let (Some(fp), Some((cached_fp, conn))) = (fingerprint, cache.get(path)) {
+        if *cached_fp == fp {
+            return Ok(conn.clone());
+        }
+    }
+    let conn = rusqlite::Connection::open_with_flags(
+        path,
+        OpenFlags::SQLITE_OPEN_READ_ONLY | OpenFlags::SQLITE_OPEN_NO_MUTEX,
+    )
+    .map_err(|e| format!("打开本地数据库失败: {}", e))?;
+    let conn = Arc::new(Mutex::new(conn));
+    match fingerprint {
+        Some(fp) => {
+            cache.insert(path.to_string(), (fp, conn.clone()));
+        }
+        None => {
+            cache.remove(path);
+        }
+    }
+    Ok(conn)
+}
+
+/// 关闭指定路径的缓存连接（文件将被删除或覆盖前调用）
+fn evict_read_connection(path: &str) {
+    read_conn_cache().lock().unwrap().remove(path);
+}
+
 /// 解析本地数据库保存路径
 fn resolve_local_db_path(target_path: Option<String>, uuid_str: &str) -> String {
     if let Some(path) = target_path {
@@ -60,18 +117,36 @@ fn normalize_sync_range(start_time: Option<i64>, end_time: Option<i64>) -> Resul
     }
 }
 
-/// 单引号安全转义（用于远程 shell 命令）
-#[cfg(test)]
-fn quote_shell_single(value: &str) -> String {
-    format!("'{}'", value.replace('\'', "'\"'\"'"))
+/// 按时间范围生成子库的远程 Python 脚本（单行，兼容不支持多行命令的 SSH 网关）
+/// 脚本内容固定，路径与时间范围通过 argv 传入：
+/// argv[1]=源库 argv[2]=子库 argv[3..4]=毫秒范围（data_wide） argv[5..6]=秒级范围（demand_results）
+/// 子库按时间顺序写入并在远程建好时间列索引，本地查询/导出的范围过滤与排序可直接走索引；
+/// 成功时输出 `ok <子库字节数>`，无需再单独执行 ls 验证文件
+const RANGE_SNAPSHOT_SCRIPT: &str = "import os,sqlite3,sys; src_path,dst_path=sys.argv[1],sys.argv[2]; \
+range_ms=(int(sys.argv[3]),int(sys.argv[4])); range_s=(int(sys.argv[5]),int(sys.argv[6])); \
+os.path.exists(dst_path) and os.remove(dst_path); \
+dst=sqlite3.connect(dst_path); dst.execute(\"ATTACH DATABASE ? AS srcdb\", (src_path,)); \
+cur=dst.cursor(); tables={row[0] for row in cur.execute(\"SELECT name FROM srcdb.sqlite_master WHERE type='table'\")}; \
+has_wide=(\"data_wide\" in tables); has_demand=(\"demand_results\" in tables); \
+has_wide and dst.execute(\"CREATE TABLE data_wide AS SELECT * FROM srcdb.data_wide WHERE local_timestamp >= ? AND local_timestamp <= ? ORDER BY local_timestamp\", range_ms); \
+has_wide and dst.execute(\"CREATE INDEX idx_data_wide_local_timestamp ON data_wide(local_timestamp)\"); \
+has_demand and dst.execute(\"CREATE TABLE demand_results AS SELECT * FROM srcdb.demand_results WHERE timestamp >= ? AND timestamp <= ? ORDER BY timestamp\", range_s); \
+has_demand and dst.execute(\"CREATE INDEX idx_demand_results_timestamp ON demand_results(timestamp)\"); \
+dst.commit(); dst.execute(\"DETACH DATABASE srcdb\"); dst.close(); \
+print((\"ok %d\" % os.path.getsize(dst_path)) if (has_wide or has_demand) else (\"missing_tables:\" + \",\".join(sorted(tables))))";
+
+/// 解析时间范围快照脚本输出（`ok <子库字节数>`），返回子库大小
+fn parse_range_snapshot_output(stdout: &str) -> Option<u64> {
+    stdout
+        .lines()
+        .find_map(|line| line.trim().strip_prefix("ok ")?.trim().parse().ok())
 }
 
-/// 单引号转义（用于嵌入 Python 单引号字符串）
-fn quote_python_single(value: &str) -> String {
-    value.replace('\\', "\\\\").replace('\'', "\\'")
-}
+/// 远程 Python 解释器探测：在同一条命令里用 command -v 选出 python3（缺失时退回 python），
+/// 结果存入 $py，不再因解释器不存在而整条命令失败后重试
+const PYTHON_PROBE: &str = "py=$(command -v python3 || command -v python)";
 
-/// 构造“按时间范围生成子库”的远程 Python 命令（单行 -c，兼容不支持多行命令的 SSH 网关）
+/// 构造“按时间范围生成子库”的远程命令：固定脚本与各参数都经 shell 单引号转义，参数作为 argv 传入
 fn build_range_snapshot_command(
     db_path: &str,
     remote_tmp: &str,
@@ -80,26 +155,101 @@ fn build_range_snapshot_command(
     range_start_s: i64,
     range_end_s: i64,
 ) -> String {
-    let db_path_py = quote_python_single(db_path);
-    let remote_tmp_py = quote_python_single(remote_tmp);
     format!(
-        "python3 -c \"import os,sqlite3,sys; src_path='{db_path}'; dst_path='{remote_tmp}'; os.path.exists(dst_path) and os.remove(dst_path); \
-dst=sqlite3.connect(dst_path); dst.execute('ATTACH DATABASE ? AS srcdb', (src_path,)); \
-cur=dst.cursor(); tables={{row[0] for row in cur.execute('SELECT name FROM srcdb.sqlite_master WHERE type=\\'table\\'')}}; \
-has_wide=('data_wide' in tables); has_demand=('demand_results' in tables); \
-has_wide and dst.execute('CREATE TABLE data_wide AS SELECT * FROM srcdb.data_wide WHERE local_timestamp >= ? AND local_timestamp <= ?', ({range_start_ms}, {range_end_ms})); \
-has_demand and dst.execute('CREATE TABLE demand_results AS SELECT * FROM srcdb.demand_results WHERE timestamp >= ? AND timestamp <= ?', ({range_start_s}, {range_end_s})); \
-dst.commit(); dst.execute('DETACH DATABASE srcdb'); dst.close(); \
-print('ok' if (has_wide or has_demand) else ('missing_tables:' + ','.join(sorted(tables))))\"",
-        db_path = db_path_py,
-        remote_tmp = remote_tmp_py,
-        range_start_ms = range_start_ms,
-        range_end_ms = range_end_ms,
-        range_start_s = range_start_s,
-        range_end_s = range_end_s
+        "{} && \"$py\" -c {} {} {} {} {} {} {}",
+        PYTHON_PROBE,
+        quote_shell_single(RANGE_SNAPSHOT_SCRIPT),
+        quote_shell_single(db_path),
+        quote_shell_single(remote_tmp),
+        range_start_ms,
+        range_end_ms,
+        range_start_s,
+        range_end_s
+    )
+}
+
+/// 全量快照实际采用的方式（由远程脚本输出的 `method:` 行给出）
+#[derive(Debug, Clone, Copy, PartialEq, Eq)]
+enum SnapshotMethod {
+    Sqlite3Backup,
+    PythonBackup,
+    Copy,
+}
+
+/// 构造全量快照的远程 shell 命令：sqlite3 .backup → python sqlite3.backup → cp + WAL/SHM
+/// 三级回退在同一次 exec 中完成，末尾输出 `method:<方式>` 与 `ls -l` 结果，
+/// 以文件实际存在为准（不信任各级命令的 exit code，JumpServer 可能返回假成功）
+fn build_full_snapshot_command(db_path: &str, remote_tmp: &str) -> String {
+    format!(
+        "src={src}; dst={dst}; m=none; {probe}; \
+if sqlite3 \"$src\" \".backup '$dst'\" >/dev/null 2>&1 && [ -f \"$dst\" ]; then m=sqlite3; \
+elif [ -n \"$py\" ] && \"$py\" -c \"import sqlite3,sys; s=sqlite3.connect(sys.argv[1]); d=sqlite3.connect(sys.argv[2]); s.backup(d); d.close(); s.close()\" \"$src\" \"$dst\" >/dev/null 2>&1 && [ -f \"$dst\" ]; then m=python; \
+elif cp \"$src\" \"$dst\"; then cp \"$src-wal\" \"$dst-wal\" 2>/dev/null; cp \"$src-shm\" \"$dst-shm\" 2>/dev/null; m=cp; fi; \
+echo \"method:$m\"; ls -l \"$dst\" 2>&1",
+        src = quote_shell_single(db_path),
+        dst = quote_shell_single(remote_tmp),
+        probe = PYTHON_PROBE
+    )
+}
+
+/// 解析全量快照脚本输出，返回（快照方式, `ls -l` 行）
+fn parse_full_snapshot_output(stdout: &str) -> Option<(SnapshotMethod, &str)> {
+    let mut lines = stdout.lines().map(str::trim).filter(|line| !line.is_empty());
+    let method = match lines.next()?.strip_prefix("method:")? {
+        "sqlite3" => SnapshotMethod::Sqlite3Backup,
+        "python" => SnapshotMethod::PythonBackup,
+        "cp" => SnapshotMethod::Copy,
+        _ => return None,
+    };
+    let file_info = lines.next()?;
+    if file_info.contains("No such file") {
+        return None;
+    }
+    Some((method, file_info))
+}
+
+/// 快照生成后在远程用 gzip -1 压缩，成功时输出 `gzip:<压缩后字节数>`；
+/// 远程没有 gzip 或压缩失败时不输出该行，仍下载未压缩的快照
+fn build_compress_snapshot_command(remote_tmp: &str) -> String {
+    format!(
+        "f={f}; if command -v gzip >/dev/null 2>&1 && gzip -1 -c \"$f\" > \"$f.gz\"; then echo \"gzip:$(wc -c < \"$f.gz\")\"; else rm -f \"$f.gz\"; fi",
+        f = quote_shell_single(remote_tmp)
     )
 }
 
+/// 解析压缩步骤输出，返回压缩文件大小
+fn parse_compressed_size(stdout: &str) -> Option<u64> {
+    stdout
+        .lines()
+        .find_map(|line| line.trim().strip_prefix("gzip:")?.trim().parse().ok())
+}
+
+/// 生成清理远程快照临时文件的命令：快照本身、压缩文件以及 cp 回退时的 WAL/SHM，
+/// 不存在的文件由 rm -f 忽略，无需区分快照方式
+fn build_remote_cleanup_command(remote_tmp: &str) -> String {
+    format!(
+        "f={f}; rm -f \"$f\" \"$f.gz\" \"$f-wal\" \"$f-shm\"",
+        f = quote_shell_single(remote_tmp)
+    )
+}
+
+/// 在后台执行远程清理命令：结果不影响同步结果，无需等待这次往返再返回
+fn spawn_remote_cleanup(cleanup_cmd: String) {
+    tauri::async_runtime::spawn(async move {
+        let _ = SshClient::execute_command(&cleanup_cmd).await;
+    });
+}
+
+/// 将下载的 gzip 文件解压到目标路径，返回解压后的字节数
+fn gunzip_file(src: &str, dst: &str) -> std::io::Result<u64> {
+    let input = std::io::BufReader::with_capacity(1 << 20, std::fs::File::open(src)?);
+    let mut decoder = flate2::read::GzDecoder::new(input);
+    let mut output = std::io::BufWriter::with_capacity(1 << 20, std::fs::File::create(dst)?);
+    let written = std::io::copy(&mut decoder, &mut output)?;
+    std::io::Write::flush(&mut output)?;
+    Ok(written)
+}
+
 /// 同步远程数据库到本地缓存，返回本地文件路径
 pub async fn sync_database(
     db_path: String,
@@ -117,9 +267,12 @@ pub async fn sync_database(
     let uuid_str = Uuid::new_v4().simple().encode_lower(&mut uuid_buf).to_string();
     let remote_tmp = format!("/tmp/remote_tool_backup_{}.db", uuid_str);
 
-    let verify_cmd = format!("ls -l \"{}\" 2>&1", remote_tmp);
     let mut used_cp_fallback = false;
-    let mut file_info: String;
+    // 远程快照就绪信息（用于日志）与文件大小（用于进度条）
+    let file_info: String;
+    let total_size: Option<u64>;
+    // 远程压缩成功时为 .gz 文件大小，此时下载压缩文件并在本地解压
+    let compressed_size: Option<u64>;
     if let Some((range_start, range_end)) = sync_range {
         let range_start_ms = range_start * 1000;
         let range_end_ms = range_end * 1000;
@@ -132,13 +285,18 @@ pub async fn sync_database(
         );
         add_query_log(app_handle_ref, "远程生成时间范围子库快照...");
 
-        let py_range_cmd = build_range_snapshot_command(
-            &db_path,
-            &remote_tmp,
-            range_start_ms,
-            range_end_ms,
-            range_start,
-            range_end,
+        // 子库生成成功后在同一次 exec 中压缩
+        let py_range_cmd = format!(
+            "{} && {{ {}; }}",
+            build_range_snapshot_command(
+                &db_path,
+                &remote_tmp,
+                range_start_ms,
+                range_end_ms,
+                range_start,
+                range_end,
+            ),
+            build_compress_snapshot_command(&remote_tmp)
         );
 
         let (range_exit, range_stdout, range_stderr) = SshClient::execute_command(&py_range_cmd)
@@ -146,184 +304,167 @@ pub async fn sync_database(
             .map_err(|e| format!("执行按时间范围同步失败: {}", e))?;
         if range_exit != 0 {
             return Err(format!(
-                "按时间范围生成子库失败（需要远程 python3 + sqlite3）: {}",
+                "按时间范围生成子库失败（需要远程 python3/python + sqlite3）: {}",
                 range_stderr.trim()
             ));
         }
-        if !range_stdout.trim().contains("ok") {
-            return Err(format!(
+        // 脚本以实际写出的子库大小作为成功标志，省去一次 ls 验证往返
+        let size = parse_range_snapshot_output(&range_stdout).ok_or_else(|| {
+            format!(
                 "按时间范围生成子库失败：未找到 data_wide 或 demand_results 表。python 输出: stdout=`{}` stderr=`{}`",
                 range_stdout.trim(),
                 range_stderr.trim()
-            ));
-        }
-
-        let (verify_exit, file_info_temp, _) = SshClient::execute_command(&verify_cmd)
-            .await
-            .map_err(|e| format!("验证远程文件失败: {}", e))?;
-        if verify_exit != 0 || file_info_temp.contains("No such file") {
-            return Err(format!(
-                "按时间范围生成子库失败。python 输出: stdout=`{}` stderr=`{}`；ls 输出: {}",
-                range_stdout.trim(),
-                range_stderr.trim(),
-                file_info_temp.trim()
-            ));
-        }
-        file_info = file_info_temp;
+            )
+        })?;
+        file_info = format!("{}（{} 字节）", remote_tmp, size);
+        total_size = Some(size);
+        compressed_size = parse_compressed_size(&range_stdout);
     } else {
         // 全量同步时使用三级备份策略：sqlite3 .backup → python sqlite3.backup → cp + WAL
-        // 以验证结果为准，不信任 exit_code（JumpServer 可能返回假成功）
-        add_query_log(app_handle_ref, "尝试使用 sqlite3 .backup 创建数据库快照...");
-        let backup_cmd = format!("sqlite3 \"{}\" \".backup '{}'\"", db_path, remote_tmp);
-        let _ = SshClient::execute_command(&backup_cmd)
+        // 整条回退链放在一个远程脚本里执行，只需一次 SSH 往返
+        add_query_log(app_handle_ref, "创建远程数据库快照（sqlite3 .backup → Python backup → cp）...");
+        let snapshot_cmd = format!(
+            "{}; {}",
+            build_full_snapshot_command(&db_path, &remote_tmp),
+            build_compress_snapshot_command(&remote_tmp)
+        );
+        let (_, snapshot_stdout, snapshot_stderr) = SshClient::execute_command(&snapshot_cmd)
             .await
             .map_err(|e| format!("执行远程备份命令失败: {}", e))?;
-
-        let (verify_exit, file_info_temp, _) = SshClient::execute_command(&verify_cmd)
-            .await
-            .map_err(|e| format!("验证远程文件失败: {}", e))?;
-        file_info = file_info_temp;
-        let mut need_next = verify_exit != 0 || file_info.contains("No such file");
-
-        if need_next {
-            // 第 2 级：Python sqlite3.Connection.backup()
-            add_query_log(app_handle_ref, "备份文件未生成，尝试 Python backup...");
-            let py_backup_cmd = format!(
-                "python3 -c \"import sqlite3; s=sqlite3.connect('{}'); d=sqlite3.connect('{}'); s.backup(d); d.close(); s.close(); print('ok')\"",
-                db_path, remote_tmp
-            );
-            let (py_exit, py_stdout, py_stderr) = SshClient::execute_command(&py_backup_cmd)
-                .await
-                .map_err(|e| format!("执行 Python 备份命令失败: {}", e))?;
-
-            if py_exit != 0 || !py_stdout.trim().contains("ok") {
-                let py_not_found = py_stderr.to_lowercase().contains("command not found")
-                    || py_stderr.to_lowercase().contains("not found")
-                    || py_stderr.to_lowercase().contains("no module");
-                if py_not_found {
-                    add_query_log(app_handle_ref, "Python 不可用，使用 cp 复制...");
-                } else {
-                    add_query_log(app_handle_ref, &format!("Python 备份失败({}), 使用 cp 复制...", py_stderr.trim()));
-                }
-            } else {
-                add_query_log(app_handle_ref, "Python sqlite3.backup 快照创建成功");
-            }
-
-            let (v_exit, v_stdout, _) = SshClient::execute_command(&verify_cmd)
-                .await
-                .map_err(|e| format!("验证远程文件失败: {}", e))?;
-            file_info = v_stdout;
-            need_next = v_exit != 0 || file_info.contains("No such file");
-
-            if need_next {
-                // 第 3 级：cp + WAL/SHM
-                add_query_log(app_handle_ref, "备份文件未生成，使用 cp 复制...");
-                used_cp_fallback = true;
-                let cp_cmd = format!(
-                    "cp \"{}\" \"{}\" && cp \"{}-wal\" \"{}-wal\" 2>/dev/null; cp \"{}-shm\" \"{}-shm\" 2>/dev/null; true",
-                    db_path, remote_tmp,
-                    db_path, remote_tmp,
-                    db_path, remote_tmp
-                );
-                let (cp_exit, _, cp_stderr) = SshClient::execute_command(&cp_cmd)
-                    .await
-                    .map_err(|e| format!("执行远程复制命令失败: {}", e))?;
-                if cp_exit != 0 {
-                    return Err(format!("远程复制数据库文件失败: {}", cp_stderr.trim()));
-                }
-                let (v2_exit, v2_stdout, _) = SshClient::execute_command(&verify_cmd)
-                    .await
-                    .map_err(|e| format!("验证远程文件失败: {}", e))?;
-                if v2_exit != 0 || v2_stdout.contains("No such file") {
-                    return Err(format!("远程数据库文件无法创建。ls 输出: {}", v2_stdout.trim()));
-                }
-                file_info = v2_stdout;
-            }
+        let (method, info) = parse_full_snapshot_output(&snapshot_stdout).ok_or_else(|| {
+            format!(
+                "远程数据库文件无法创建。输出: stdout=`{}` stderr=`{}`",
+                snapshot_stdout.trim(),
+                snapshot_stderr.trim()
+            )
+        })?;
+        match method {
+            SnapshotMethod::Sqlite3Backup => add_query_log(app_handle_ref, "sqlite3 .backup 快照创建成功"),
+            SnapshotMethod::PythonBackup => add_query_log(app_handle_ref, "sqlite3 不可用，Python sqlite3.backup 快照创建成功"),
+            SnapshotMethod::Copy => add_query_log(app_handle_ref, "备份方式均不可用，已使用 cp 复制（含 WAL/SHM）"),
         }
+        used_cp_fallback = method == SnapshotMethod::Copy;
+        file_info = info.to_string();
+        // 从 ls -l 输出解析文件大小（第5列）
+        total_size = info.split_whitespace().nth(4).and_then(|s| s.parse().ok());
+        compressed_size = parse_compressed_size(&snapshot_stdout);
     }
 
     add_query_log(app_handle_ref, &format!("远程文件就绪: {}", file_info.trim()));
 
-    // 从 ls -l 输出解析文件大小（第5列），用于进度条
-    let total_size: Option<u64> = file_info
-        .split_whitespace()
-        .nth(4)
-        .and_then(|s| s.parse().ok());
-
     // 解析本地落盘路径（支持用户自定义）
     let local_path_str = resolve_local_db_path(target_path, &uuid_str);
-    let local_path = PathBuf::from(&local_path_str);
+    // 目标文件可能正被缓存连接打开（覆盖同一自定义路径），下载前先关闭
+    evict_read_connection(&local_path_str);
+
+    // 远程已压缩时下载 .gz 文件，进度按压缩后的大小计算
+    let remote_gz = format!("{}.gz", remote_tmp);
+    let local_gz = format!("{}.gz", local_path_str);
+    let (download_remote, download_local, download_size) = match compressed_size {
+        Some(size) => {
+            add_query_log(
+                app_handle_ref,
+                &format!(
+                    "远程快照已压缩: {:.2}MB → {:.2}MB",
+                    total_size.unwrap_or(0) as f64 / 1024.0 / 1024.0,
+                    size as f64 / 1024.0 / 1024.0
+                ),
+            );
+            (remote_gz.as_str(), local_gz.as_str(), Some(size))
+        }
+        None => (remote_tmp.as_str(), local_path_str.as_str(), total_size),
+    };
+
+    // 远程快照产生的所有临时文件在一条命令中清理，下载或解压失败时同样执行；
+    // 清理在后台进行，同步结果不必等待这次往返
+    let remote_cleanup_cmd = build_remote_cleanup_command(&remote_tmp);
 
     // SFTP 流式下载（分块读写，不加载整个文件到内存），带进度事件
     add_query_log(app_handle_ref, "通过 SFTP 下载数据库文件...");
-    if let (Some(handle), Some(total)) = (app_handle_ref, total_size) {
-        use tauri::Emitter;
-        let _ = handle.emit("db-sync-progress", serde_json::json!({
-            "downloaded": 0,
-            "total": total,
-            "percent": 0
-        }));
-    }
-    let on_progress = app_handle_ref.map(|_handle| {
-        use tauri::Emitter;
-        let handle = _handle.clone();
-        let (progress_tx, mut progress_rx) = tokio::sync::mpsc::channel::<(u64, u64)>(16);
-        let handle_clone = handle.clone();
-        tauri::async_runtime::spawn(async move {
-            while let Some((downloaded, total)) = progress_rx.recv().await {
-                let percent = if total > 0 {
-                    ((downloaded * 100) / total).min(100) as u32
-                } else {
-                    0
-                };
-                let _ = handle_clone.emit("db-sync-progress", serde_json::json!({
-                    "downloaded": downloaded,
-                    "total": total,
-                    "percent": percent
-                }));
-            }
+    if let (Some(handle), Some(total)) = (app_handle_ref, download_size) {
+        let _ = handle.emit("db-sync-progress", SyncProgress {
+            downloaded: 0,
+            total,
+            percent: 0,
         });
-        std::sync::Arc::new(move |d: u64, t: u64| {
-            let _ = progress_tx.try_send((d, t));
+    }
+    // 回调约每 2% 才触发一次，emit 本身是非阻塞的，直接在回调中发送进度，
+    // 不再经过通道与额外的转发任务
+    let on_progress = app_handle_ref.map(|handle| {
+        let handle = handle.clone();
+        std::sync::Arc::new(move |downloaded: u64, total: u64| {
+            let percent = if total > 0 {
+                ((downloaded * 100) / total).min(100) as u32
+            } else {
+                0
+            };
+            let _ = handle.emit("db-sync-progress", SyncProgress {
+                downloaded,
+                total,
+                percent,
+            });
         }) as std::sync::Arc<dyn Fn(u64, u64) + Send + Sync>
     });
-    SshClient::download_file_with_progress(
-        &remote_tmp,
-        &local_path_str,
-        total_size,
+    let downloaded_bytes = SshClient::download_file_with_progress(
+        download_remote,
+        download_local,
+        download_size,
         on_progress,
     )
-    .await
-    .map_err(|e| format!("下载数据库文件失败: {}", e))?;
+    .await;
+    let downloaded_bytes = match downloaded_bytes {
+        Ok(n) => n,
+        Err(e) => {
+            spawn_remote_cleanup(remote_cleanup_cmd);
+            return Err(format!("下载数据库文件失败: {}", e));
+        }
+    };
+
+    // 下载与解压过程已经给出了落盘字节数，不再事后 stat 本地文件
+    let mut file_size = downloaded_bytes;
+    if compressed_size.is_some() {
+        add_query_log(app_handle_ref, "解压数据库文件...");
+        let (gz_path, db_path_out) = (local_gz.clone(), local_path_str.clone());
+        let unpacked = tokio::task::spawn_blocking(move || {
+            let result = gunzip_file(&gz_path, &db_path_out);
+            let _ = std::fs::remove_file(&gz_path);
+            result
+        })
+        .await
+        .map_err(|e| format!("执行解压线程失败: {}", e))
+        .and_then(|r| r.map_err(|e| format!("解压数据库文件失败: {}", e)));
+        file_size = match unpacked {
+            Ok(n) => n,
+            Err(e) => {
+                spawn_remote_cleanup(remote_cleanup_cmd);
+                return Err(e);
+            }
+        };
+    }
 
     // cp 路径下需要额外下载 WAL/SHM 文件；sqlite3 .backup 和 Python backup 生成的是完整独立 .db
+    // 两个文件互不依赖，并发下载
     if used_cp_fallback {
         let remote_wal = format!("{}-wal", remote_tmp);
         let local_wal = format!("{}-wal", local_path_str);
-        if SshClient::download_file(&remote_wal, &local_wal).await.is_ok() {
-            add_query_log(app_handle_ref, "已下载 WAL 文件");
-        }
         let remote_shm = format!("{}-shm", remote_tmp);
         let local_shm = format!("{}-shm", local_path_str);
-        if SshClient::download_file(&remote_shm, &local_shm).await.is_ok() {
+        let (wal_result, shm_result) = tokio::join!(
+            SshClient::download_file(&remote_wal, &local_wal),
+            SshClient::download_file(&remote_shm, &local_shm),
+        );
+        if wal_result.is_ok() {
+            add_query_log(app_handle_ref, "已下载 WAL 文件");
+        }
+        if shm_result.is_ok() {
             add_query_log(app_handle_ref, "已下载 SHM 文件");
         }
     }
 
-    // 验证下载的文件
-    let file_size = std::fs::metadata(&local_path)
-        .map_err(|e| format!("获取下载文件信息失败: {}", e))?
-        .len();
     add_query_log(app_handle_ref, &format!("数据库下载完成，文件大小: {:.2}MB", file_size as f64 / 1024.0 / 1024.0));
 
-    // 清理远程临时文件
-    if used_cp_fallback {
-        let _ = SshClient::execute_command(&format!(
-            "rm -f \"{}\" \"{}-wal\" \"{}-shm\"", remote_tmp, remote_tmp, remote_tmp
-        )).await;
-    } else {
-        let _ = SshClient::execute_command(&format!("rm -f \"{}\"", remote_tmp)).await;
-    }
+    // 清理远程临时文件（后台执行，不阻塞返回）
+    spawn_remote_cleanup(remote_cleanup_cmd);
 
     // 更新缓存
     {
@@ -332,6 +473,7 @@ pub async fn sync_database(
         if let Some(old) = cache.remove(&db_path) {
             // 仅自动清理临时目录缓存文件，避免误删用户自定义路径文件
             if is_temp_cache_path(&old.local_path) && old.local_path != local_path_str {
+                evict_read_connection(&old.local_path);
                 let _ = std::fs::remove_file(&old.local_path);
             }
         }
@@ -361,11 +503,17 @@ fn get_cached_db_path(remote_db_path: &str) -> Result<String, String> {
 }
 
 /// 校验数据库是否包含导出所需关键表
-fn validate_database_schema(table_names: Vec<String>) -> Result<(), String> {
-    let has_wide = table_names.iter().any(|t| t == "data_wide");
-    let has_demand = table_names.iter().any(|t| t == "demand_results");
-
-    if has_wide || has_demand {
+fn validate_database_schema<I, S>(table_names: I) -> Result<(), String>
+where
+    I: IntoIterator<Item = S>,
+    S: AsRef<str>,
+{
+    // 单次遍历表名，命中任一可用表即停止
+    let has_supported = table_names
+        .into_iter()
+        .any(|t| matches!(t.as_ref(), "data_wide" | "demand_results"));
+
+    if has_supported {
         Ok(())
     } else {
         Err("数据库缺少可用数据表（需要 data_wide 或 demand_results）".to_string())
@@ -374,21 +522,24 @@ fn validate_database_schema(table_names: Vec<String>) -> Result<(), String> {
 
 /// 校验本地数据库文件可用性（导入前使用）
 pub async fn validate_local_database(path: String) -> Result<(), String> {
-    let path_obj = Path::new(&path);
-    if !path_obj.exists() {
-        return Err("数据库文件不存在，请重新选择".to_string());
-    }
-    if !path_obj.is_file() {
+    // 一次 stat 同时完成存在性、文件类型判断，并取得缓存键（修改时间 + 大小）
+    let metadata = std::fs::metadata(&path)
+        .map_err(|_| "数据库文件不存在，请重新选择".to_string())?;
+    if !metadata.is_file() {
         return Err("所选路径不是数据库文件".to_string());
     }
+    let fingerprint = metadata.modified().ok().map(|mtime| (mtime, metadata.len()));
+    if let Some(fp) = fingerprint {
+        if validated_db_cache().lock().unwrap().get(&path) == Some(&fp) {
+            return Ok(());
+        }
+    }
 
     let path_clone = path.clone();
     tokio::task::spawn_blocking(move || -> Result<(), String> {
-        let conn = rusqlite::Connection::open_with_flags(
-            &path_clone,
-            OpenFlags::SQLITE_OPEN_READ_ONLY | OpenFlags::SQLITE_OPEN_NO_MUTEX,
-        )
-        .map_err(|e| format!("打开数据库失败: {}", e))?;
+        // 与后续查询共用缓存连接，校验后的首次查询无需再次打开文件
+        let conn = cached_read_connection(&path_clone)?;
+        let conn = conn.lock().unwrap();
 
         let mut stmt = conn
             .prepare("SELECT name FROM sqlite_master WHERE type='table'")
@@ -398,21 +549,25 @@ pub async fn validate_local_database(path: String) -> Result<(), String> {
             .query_map([], |row| row.get::<_, String>(0))
             .map_err(|e| format!("查询数据表失败: {}", e))?;
 
-        let mut tables: Vec<String> = Vec::new();
-        for row in rows {
-            tables.push(row.map_err(|e| format!("读取数据表失败: {}", e))?);
-        }
+        let tables = rows
+            .collect::<Result<Vec<String>, _>>()
+            .map_err(|e| format!("读取数据表失败: {}", e))?;
 
-        validate_database_schema(tables)
+        validate_database_schema(&tables)
     })
     .await
     .map_err(|e| format!("执行数据库校验线程失败: {}", e))??;
 
+    if let Some(fp) = fingerprint {
+        validated_db_cache().lock().unwrap().insert(path, fp);
+    }
     Ok(())
 }
 
 /// 清除所有数据库缓存
 pub fn clear_db_cache() {
+    // 先关闭缓存的连接，Windows 下文件被打开时无法删除
+    read_conn_cache().lock().unwrap().clear();
     let mut cache = db_cache().lock().unwrap();
     for (_, cached) in cache.drain() {
         let _ = std::fs::remove_file(&cached.local_path);
@@ -436,26 +591,33 @@ pub struct QueryParams {
 #[serde(rename_all = "camelCase")]
 pub struct QueryResult {
     pub columns: Vec<String>,
-    pub rows: Vec<serde_json::Value>,
+    /// 按列位置存放的行数据（与 columns 一一对应），不再为每行重复列名
+    pub rows: Vec<Vec<serde_json::Value>>,
     pub total_rows: usize,
 }
 
+/// 数据库同步下载进度事件（db-sync-progress）
+/// 直接序列化为事件负载，不再经过中间的 serde_json::Value
+#[derive(Debug, Clone, Serialize)]
+struct SyncProgress {
+    downloaded: u64,
+    total: u64,
+    percent: u32,
+}
+
 // 格式化时间戳为GMT+8时区字符串
 fn format_gmt8_time(timestamp: i64) -> String {
-    let beijing_tz = FixedOffset::east_opt(8 * 3600).unwrap();
-    let dt = Utc.timestamp_opt(timestamp, 0).unwrap().with_timezone(&beijing_tz);
+    let dt = Utc.timestamp_opt(timestamp, 0).unwrap().with_timezone(&BEIJING_TZ);
     dt.format("%Y-%m-%d %H:%M:%S").to_string()
 }
 
 // 添加带时间戳的日志并发送事件
 fn add_query_log(app_handle: Option<&tauri::AppHandle>, message: &str) {
-    let beijing_tz = FixedOffset::east_opt(8 * 3600).unwrap();
-    let now = Utc::now().with_timezone(&beijing_tz);
+    let now = Utc::now().with_timezone(&BEIJING_TZ);
     let log_message = format!("[{}] {}", now.format("%H:%M:%S"), message);
     
     // 发送事件到前端
     if let Some(handle) = app_handle {
-        use tauri::Emitter;
         let _ = handle.emit("query-log", &log_message);
     }
     
@@ -463,19 +625,21 @@ fn add_query_log(app_handle: Option<&tauri::AppHandle>, message: &str) {
     eprintln!("{}", log_message);
 }
 
-/// 检查表是否存在
-fn check_table_exists(conn: &rusqlite::Connection, table_name: &str) -> Result<(), String> {
-    let exists: bool = conn
-        .query_row(
-            "SELECT COUNT(*) > 0 FROM sqlite_master WHERE type='table' AND name=?1",
-            rusqlite::params![table_name],
-            |row| row.get(0),
-        )
-        .map_err(|e| format!("检查表是否存在失败: {}", e))?;
-    if !exists {
-        return Err(format!("数据库中不存在 {} 表", table_name));
-    }
-    Ok(())
+/// 准备针对单表的查询语句；表不存在时由 prepare 本身报错，
+/// 不再额外查询一次 sqlite_master
+fn prepare_table_query<'conn>(
+    conn: &'conn rusqlite::Connection,
+    table_name: &str,
+    sql: &str,
+) -> Result<rusqlite::Statement<'conn>, String> {
+    conn.prepare(sql).map_err(|e| {
+        let message = e.to_string();
+        if message.contains("no such table") {
+            format!("数据库中不存在 {} 表", table_name)
+        } else {
+            format!("准备SQL语句失败: {}", message)
+        }
+    })
 }
 
 // ============================================================
@@ -508,6 +672,9 @@ pub async fn execute_query(
 // 导出宽表数据到CSV
 // ============================================================
 
+/// 流式导出时每写出多少行输出一次进度日志
+const EXPORT_PROGRESS_INTERVAL: usize = 100_000;
+
 /// 直接导出宽表数据到CSV文件（本地rusqlite查询）
 /// 返回导出的记录数
 pub async fn export_wide_table_direct(
@@ -533,107 +700,86 @@ pub async fn export_wide_table_direct(
     let start_time_ms = start_time * 1000i64;
     let end_time_ms = end_time * 1000i64;
     let output_path_clone = output_path.clone();
+    let progress_handle = app_handle.clone();
     
     // rusqlite::Connection 不是 Send，需要在阻塞线程中执行
     let result = tokio::task::spawn_blocking(move || -> Result<usize, String> {
-        let conn = rusqlite::Connection::open_with_flags(
-            &local_db_path,
-            OpenFlags::SQLITE_OPEN_READ_ONLY | OpenFlags::SQLITE_OPEN_NO_MUTEX,
-        ).map_err(|e| format!("打开本地数据库失败: {}", e))?;
+        let conn = cached_read_connection(&local_db_path)?;
+        let conn = conn.lock().unwrap();
         
-        check_table_exists(&conn, "data_wide")?;
+        let mut stmt = prepare_table_query(
+            &conn,
+            "data_wide",
+            "SELECT * FROM data_wide WHERE local_timestamp >= ?1 AND local_timestamp <= ?2 ORDER BY local_timestamp",
+        )?;
         
-        let mut stmt = conn.prepare(
-            "SELECT * FROM data_wide WHERE local_timestamp >= ?1 AND local_timestamp <= ?2 ORDER BY local_timestamp"
-        ).map_err(|e| format!("准备SQL语句失败: {}", e))?;
+        // 时间戳格式化器（前导单引号防止 Excel 自动转换格式）
+        let mut ts_formatter = TimestampFormatter::new("'", '-');
         
-        let column_count = stmt.column_count();
-        let columns: Vec<String> = (0..column_count)
-            .map(|i| stmt.column_name(i).unwrap_or("").to_string())
-            .collect();
+        // 创建文件（含UTF-8 BOM）和CSV写入器
+        let mut wtr = create_csv_writer(&output_path_clone, csv::QuoteStyle::NonNumeric)
+            .map_err(|e| format!("创建输出文件失败: {}", e))?;
         
-        // 找到 local_timestamp 列的索引
-        let ts_col_idx = columns.iter().position(|c| c == "local_timestamp");
-        
-        let beijing_tz = FixedOffset::east_opt(8 * 3600).unwrap();
-        
-        // 创建文件，写入UTF-8 BOM
-        {
-            use std::io::Write;
-            let mut file = std::fs::File::create(&output_path_clone)
-                .map_err(|e| format!("创建输出文件失败: {}", e))?;
-            file.write_all(&[0xEF, 0xBB, 0xBF])
-                .map_err(|e| format!("写入BOM失败: {}", e))?;
-        }
-        let file = std::fs::OpenOptions::new()
-            .append(true)
-            .open(&output_path_clone)
-            .map_err(|e| format!("打开输出文件失败: {}", e))?;
-        let mut wtr = csv::WriterBuilder::new()
-            .quote_style(csv::QuoteStyle::NonNumeric)
-            .from_writer(std::io::BufWriter::new(file));
-        
-        // 写入表头
-        wtr.write_record(&columns)
-            .map_err(|e| format!("写入CSV表头失败: {}", e))?;
+        // 逐行处理计划在进入循环前一次确定：列数与 local_timestamp 列下标；
+        // 表头直接借用语句中的列名写出，不再复制成 Vec<String>
+        let (column_count, ts_col_idx) = {
+            let column_names = stmt.column_names();
+            wtr.write_record(&column_names)
+                .map_err(|e| format!("写入CSV表头失败: {}", e))?;
+            (
+                column_names.len(),
+                column_names.iter().position(|c| *c == "local_timestamp"),
+            )
+        };
         
         let mut row_count: usize = 0;
-        let rows = stmt.query_map(
-            rusqlite::params![start_time_ms, end_time_ms],
-            |row| {
-                let mut values: Vec<rusqlite::types::Value> = Vec::with_capacity(column_count);
-                for i in 0..column_count {
-                    values.push(row.get::<_, rusqlite::types::Value>(i)?);
-                }
-                Ok(values)
-            },
-        ).map_err(|e| format!("执行查询失败: {}", e))?;
+        let mut rows = stmt.query(rusqlite::params![start_time_ms, end_time_ms])
+            .map_err(|e| format!("执行查询失败: {}", e))?;
         
-        for row_result in rows {
-            let values = row_result.map_err(|e| format!("读取行数据失败: {}", e))?;
-            let mut record: Vec<String> = Vec::with_capacity(column_count);
-            
-            for (i, val) in values.iter().enumerate() {
-                let field = if Some(i) == ts_col_idx {
-                    match val {
-                        rusqlite::types::Value::Integer(ms) => {
-                            let secs = *ms / 1000;
-                            let millis = (*ms % 1000) as u32;
-                            match Utc.timestamp_opt(secs, millis * 1_000_000) {
-                                chrono::LocalResult::Single(dt) => {
-                                    let dt_bj = dt.with_timezone(&beijing_tz);
-                                    format!("'{}.{:03}", dt_bj.format("%Y-%m-%d %H:%M:%S"), millis)
-                                }
-                                _ => format!("'{}", ms),
-                            }
+        // 单次遍历：直接借用当前行的列值并格式化，不再先收集 Vec<Value> 再二次遍历
+        // 字段复用同一块格式化缓冲区逐个写入，不再为每行构造 Vec<String>
+        let mut scratch = String::with_capacity(64);
+        while let Some(row) = rows.next().map_err(|e| format!("读取行数据失败: {}", e))? {
+            for i in 0..column_count {
+                let val = row.get_ref(i).map_err(|e| format!("读取行数据失败: {}", e))?;
+                if Some(i) != ts_col_idx {
+                    write_sqlite_field(&mut wtr, val, &mut scratch)
+                        .map_err(|e| format!("写入CSV行失败: {}", e))?;
+                    continue;
+                }
+                scratch.clear();
+                match val {
+                    ValueRef::Integer(ms) => {
+                        if !ts_formatter.write_millis(ms, &mut scratch) {
+                            scratch.push('\'');
+                            push_sqlite_value(&mut scratch, val);
                         }
-                        rusqlite::types::Value::Real(f) => {
-                            let ms = *f as i64;
-                            let secs = ms / 1000;
-                            let millis = (ms % 1000) as u32;
-                            match Utc.timestamp_opt(secs, millis * 1_000_000) {
-                                chrono::LocalResult::Single(dt) => {
-                                    let dt_bj = dt.with_timezone(&beijing_tz);
-                                    format!("'{}.{:03}", dt_bj.format("%Y-%m-%d %H:%M:%S"), millis)
-                                }
-                                _ => format!("'{}", f),
-                            }
+                    }
+                    ValueRef::Real(f) => {
+                        if !ts_formatter.write_millis(f as i64, &mut scratch) {
+                            scratch.push('\'');
+                            push_sqlite_value(&mut scratch, val);
                         }
-                        rusqlite::types::Value::Null => String::new(),
-                        other => format!("'{}", sqlite_value_to_csv_field(other)),
                     }
-                } else {
-                    sqlite_value_to_csv_field(val)
-                };
-                record.push(field);
+                    ValueRef::Null => {}
+                    other => {
+                        scratch.push('\'');
+                        push_sqlite_value(&mut scratch, other);
+                    }
+                }
+                wtr.write_field(scratch.as_bytes())
+                    .map_err(|e| format!("写入CSV行失败: {}", e))?;
             }
             
-            wtr.write_record(&record)
+            wtr.write_record(None::<&[u8]>)
                 .map_err(|e| format!("写入CSV行失败: {}", e))?;
             row_count += 1;
+            if row_count % EXPORT_PROGRESS_INTERVAL == 0 {
+                add_query_log(progress_handle.as_ref(), &format!("已导出 {} 条记录...", row_count));
+            }
         }
         
-        wtr.flush().map_err(|e| format!("刷新CSV文件失败: {}", e))?;
+        finish_csv_writer(wtr).map_err(|e| format!("刷新CSV文件失败: {}", e))?;
         Ok(row_count)
     })
     .await
@@ -653,6 +799,11 @@ pub async fn export_wide_table_direct(
 // 导出需量数据到CSV
 // ============================================================
 
+/// 需量导出列（表头与 SELECT 列顺序一致）
+const DEMAND_COLUMNS: [&str; 4] = ["id", "timestamp", "meter_sn", "calculated_demand"];
+/// 需量导出中需要格式化的时间戳列下标
+const DEMAND_TIMESTAMP_IDX: usize = 1;
+
 /// 直接导出需量数据到CSV文件（本地rusqlite查询）
 /// 返回导出的记录数
 pub async fn export_demand_results_direct(
@@ -676,95 +827,70 @@ pub async fn export_demand_results_direct(
     add_query_log(app_handle_ref, "使用本地缓存数据库查询...");
     
     let output_path_clone = output_path.clone();
+    let progress_handle = app_handle.clone();
     
     let result = tokio::task::spawn_blocking(move || -> Result<usize, String> {
-        let conn = rusqlite::Connection::open_with_flags(
-            &local_db_path,
-            OpenFlags::SQLITE_OPEN_READ_ONLY | OpenFlags::SQLITE_OPEN_NO_MUTEX,
-        ).map_err(|e| format!("打开本地数据库失败: {}", e))?;
+        let conn = cached_read_connection(&local_db_path)?;
+        let conn = conn.lock().unwrap();
         
-        check_table_exists(&conn, "demand_results")?;
+        let mut stmt = prepare_table_query(
+            &conn,
+            "demand_results",
+            "SELECT id, timestamp, meter_sn, calculated_demand FROM demand_results WHERE timestamp >= ?1 AND timestamp <= ?2 ORDER BY timestamp ASC",
+        )?;
         
-        let mut stmt = conn.prepare(
-            "SELECT id, timestamp, meter_sn, calculated_demand FROM demand_results WHERE timestamp >= ?1 AND timestamp <= ?2 ORDER BY timestamp ASC"
-        ).map_err(|e| format!("准备SQL语句失败: {}", e))?;
+        let mut ts_formatter = TimestampFormatter::new("'", '-');
         
-        let columns = vec!["id", "timestamp", "meter_sn", "calculated_demand"];
-        let beijing_tz = FixedOffset::east_opt(8 * 3600).unwrap();
+        // 创建文件（含UTF-8 BOM）和CSV写入器
+        let mut wtr = create_csv_writer(&output_path_clone, csv::QuoteStyle::NonNumeric)
+            .map_err(|e| format!("创建输出文件失败: {}", e))?;
         
-        // 创建文件，先写BOM
-        {
-            use std::io::Write;
-            let mut file = std::fs::File::create(&output_path_clone)
-                .map_err(|e| format!("创建输出文件失败: {}", e))?;
-            file.write_all(&[0xEF, 0xBB, 0xBF])
-                .map_err(|e| format!("写入BOM失败: {}", e))?;
-        }
-        let file = std::fs::OpenOptions::new()
-            .append(true)
-            .open(&output_path_clone)
-            .map_err(|e| format!("打开输出文件失败: {}", e))?;
-        let mut wtr = csv::WriterBuilder::new()
-            .quote_style(csv::QuoteStyle::NonNumeric)
-            .from_writer(std::io::BufWriter::new(file));
-        
-        wtr.write_record(&columns)
+        wtr.write_record(DEMAND_COLUMNS)
             .map_err(|e| format!("写入CSV表头失败: {}", e))?;
         
         let mut row_count: usize = 0;
-        let rows = stmt.query_map(
-            rusqlite::params![start_time, end_time],
-            |row| {
-                // id, timestamp, meter_sn, calculated_demand
-                Ok((
-                    row.get::<_, rusqlite::types::Value>(0)?,
-                    row.get::<_, rusqlite::types::Value>(1)?,
-                    row.get::<_, rusqlite::types::Value>(2)?,
-                    row.get::<_, rusqlite::types::Value>(3)?,
-                ))
-            },
-        ).map_err(|e| format!("执行查询失败: {}", e))?;
+        let mut rows = stmt.query(rusqlite::params![start_time, end_time])
+            .map_err(|e| format!("执行查询失败: {}", e))?;
         
-        for row_result in rows {
-            let (id_val, ts_val, meter_val, demand_val) = row_result
-                .map_err(|e| format!("读取行数据失败: {}", e))?;
-            
-            let id_field = sqlite_value_to_csv_field(&id_val);
-            
-            // timestamp 列：秒级时间戳格式化（无毫秒）
-            let ts_field = match &ts_val {
-                rusqlite::types::Value::Integer(secs) => {
-                    match Utc.timestamp_opt(*secs, 0) {
-                        chrono::LocalResult::Single(dt) => {
-                            let dt_bj = dt.with_timezone(&beijing_tz);
-                            format!("'{}", dt_bj.format("%Y-%m-%d %H:%M:%S"))
-                        }
-                        _ => format!("'{}", secs),
-                    }
+        // 单次遍历：直接借用当前行的列值（id, timestamp, meter_sn, calculated_demand），
+        // 字段复用同一块格式化缓冲区逐个写入
+        let mut scratch = String::with_capacity(64);
+        while let Some(row) = rows.next().map_err(|e| format!("读取行数据失败: {}", e))? {
+            for i in 0..DEMAND_COLUMNS.len() {
+                let val = row.get_ref(i).map_err(|e| format!("读取行数据失败: {}", e))?;
+                if i != DEMAND_TIMESTAMP_IDX {
+                    write_sqlite_field(&mut wtr, val, &mut scratch)
+                        .map_err(|e| format!("写入CSV行失败: {}", e))?;
+                    continue;
                 }
-                rusqlite::types::Value::Real(f) => {
-                    let secs = *f as i64;
-                    match Utc.timestamp_opt(secs, 0) {
-                        chrono::LocalResult::Single(dt) => {
-                            let dt_bj = dt.with_timezone(&beijing_tz);
-                            format!("'{}", dt_bj.format("%Y-%m-%d %H:%M:%S"))
-                        }
-                        _ => format!("'{}", f),
+                scratch.clear();
+                // timestamp 列：秒级时间戳格式化（无毫秒）
+                let formatted = match val {
+                    ValueRef::Integer(secs) => ts_formatter.format_secs(secs),
+                    ValueRef::Real(f) => ts_formatter.format_secs(f as i64),
+                    _ => None,
+                };
+                match formatted {
+                    Some(formatted) => scratch.push_str(formatted),
+                    None if matches!(val, ValueRef::Null) => {}
+                    None => {
+                        scratch.push('\'');
+                        push_sqlite_value(&mut scratch, val);
                     }
                 }
-                rusqlite::types::Value::Null => String::new(),
-                other => format!("'{}", sqlite_value_to_csv_field(other)),
-            };
-            
-            let meter_field = sqlite_value_to_csv_field(&meter_val);
-            let demand_field = sqlite_value_to_csv_field(&demand_val);
+                wtr.write_field(scratch.as_bytes())
+                    .map_err(|e| format!("写入CSV行失败: {}", e))?;
+            }
             
-            wtr.write_record(&[id_field, ts_field, meter_field, demand_field])
+            wtr.write_record(None::<&[u8]>)
                 .map_err(|e| format!("写入CSV行失败: {}", e))?;
             row_count += 1;
+            if row_count % EXPORT_PROGRESS_INTERVAL == 0 {
+                add_query_log(progress_handle.as_ref(), &format!("已导出 {} 条记录...", row_count));
+            }
         }
         
-        wtr.flush().map_err(|e| format!("刷新CSV文件失败: {}", e))?;
+        finish_csv_writer(wtr).map_err(|e| format!("刷新CSV文件失败: {}", e))?;
         Ok(row_count)
     })
     .await
@@ -785,22 +911,24 @@ pub async fn export_demand_results_direct(
 // ============================================================
 
 /// 执行SQL查询并返回结果（本地rusqlite）
-/// 返回 (结果数据, 列名列表)
-async fn execute_sql_query(db_path: &str, sql: &str, app_handle: Option<&tauri::AppHandle>) -> Result<(Vec<serde_json::Value>, Vec<String>), String> {
+/// SQL 为固定模板，取值通过参数绑定传入；语句经 prepare_cached 缓存在复用的连接上
+/// 返回 (按列位置排列的行数据, 列名列表)
+async fn execute_sql_query(
+    db_path: &str,
+    sql: &'static str,
+    params: Vec<rusqlite::types::Value>,
+    app_handle: Option<&tauri::AppHandle>,
+) -> Result<(Vec<Vec<serde_json::Value>>, Vec<String>), String> {
     let app_handle_ref = app_handle;
     
     let local_db_path = get_cached_db_path(db_path)?;
     add_query_log(app_handle_ref, "使用本地缓存数据库执行查询...");
     
-    let sql_owned = sql.to_string();
-    
-    let (results, columns) = tokio::task::spawn_blocking(move || -> Result<(Vec<serde_json::Value>, Vec<String>), String> {
-        let conn = rusqlite::Connection::open_with_flags(
-            &local_db_path,
-            OpenFlags::SQLITE_OPEN_READ_ONLY | OpenFlags::SQLITE_OPEN_NO_MUTEX,
-        ).map_err(|e| format!("打开本地数据库失败: {}", e))?;
+    let (results, columns) = tokio::task::spawn_blocking(move || -> Result<(Vec<Vec<serde_json::Value>>, Vec<String>), String> {
+        let conn = cached_read_connection(&local_db_path)?;
+        let conn = conn.lock().unwrap();
         
-        let mut stmt = conn.prepare(&sql_owned)
+        let mut stmt = conn.prepare_cached(sql)
             .map_err(|e| format!("SQL语句错误: {}", e))?;
         
         let column_count = stmt.column_count();
@@ -808,38 +936,20 @@ async fn execute_sql_query(db_path: &str, sql: &str, app_handle: Option<&tauri::
             .map(|i| stmt.column_name(i).unwrap_or("").to_string())
             .collect();
         
-        let mut results: Vec<serde_json::Value> = Vec::new();
+        let mut results: Vec<Vec<serde_json::Value>> = Vec::new();
         
-        let rows = stmt.query_map([], |row| {
-            let mut values: Vec<rusqlite::types::Value> = Vec::with_capacity(column_count);
-            for i in 0..column_count {
-                values.push(row.get::<_, rusqlite::types::Value>(i)?);
-            }
-            Ok(values)
-        }).map_err(|e| format!("执行查询失败: {}", e))?;
+        let mut rows = stmt.query(rusqlite::params_from_iter(params))
+            .map_err(|e| format!("执行查询失败: {}", e))?;
         
-        for row_result in rows {
-            let values = row_result.map_err(|e| format!("读取行数据失败: {}", e))?;
-            let mut row_map = serde_json::Map::new();
-            
-            for (i, val) in values.iter().enumerate() {
-                let json_val = match val {
-                    rusqlite::types::Value::Null => serde_json::Value::Null,
-                    rusqlite::types::Value::Integer(n) => serde_json::Value::Number((*n).into()),
-                    rusqlite::types::Value::Real(f) => {
-                        serde_json::Number::from_f64(*f)
-                            .map(serde_json::Value::Number)
-                            .unwrap_or(serde_json::Value::Null)
-                    }
-                    rusqlite::types::Value::Text(s) => serde_json::Value::String(s.clone()),
-                    rusqlite::types::Value::Blob(b) => {
-                        serde_json::Value::String(format!("[BLOB {} bytes]", b.len()))
-                    }
-                };
-                row_map.insert(columns[i].clone(), json_val);
+        // 直接借用当前行的列值转换为 JSON，不再先为每行收集一份 Vec<rusqlite::types::Value>
+        while let Some(row) = rows.next().map_err(|e| format!("读取行数据失败: {}", e))? {
+            // 行数据按列位置存放，列名只在 columns 中出现一次
+            let mut row_values: Vec<serde_json::Value> = Vec::with_capacity(column_count);
+            for i in 0..column_count {
+                let val = row.get_ref(i).map_err(|e| format!("读取行数据失败: {}", e))?;
+                row_values.push(sqlite_value_to_json(val));
             }
-            
-            results.push(serde_json::Value::Object(row_map));
+            results.push(row_values);
         }
         
         Ok((results, columns))
@@ -859,13 +969,13 @@ async fn execute_wide_table_query(params: QueryParams, app_handle: Option<tauri:
     let start_time_ms = params.start_time * 1000; // 转换为毫秒
     let end_time_ms = params.end_time * 1000;
     
-    let sql = format!(
-        "SELECT * FROM data_wide WHERE local_timestamp >= {} AND local_timestamp <= {} ORDER BY local_timestamp ASC",
-        start_time_ms, end_time_ms
-    );
-    
     // 执行查询，获取结果和列名
-    let (results, columns) = execute_sql_query(&params.db_path, &sql, app_handle_ref).await?;
+    let (results, columns) = execute_sql_query(
+        &params.db_path,
+        "SELECT * FROM data_wide WHERE local_timestamp >= ?1 AND local_timestamp <= ?2 ORDER BY local_timestamp ASC",
+        vec![start_time_ms.into(), end_time_ms.into()],
+        app_handle_ref,
+    ).await?;
     
     if results.is_empty() {
         add_query_log(app_handle_ref, "查询结果为空");
@@ -890,20 +1000,61 @@ async fn execute_wide_table_query(params: QueryParams, app_handle: Option<tauri:
 // 工具函数
 // ============================================================
 
-/// 将 rusqlite Value 转换为 CSV 字段字符串
-fn sqlite_value_to_csv_field(val: &rusqlite::types::Value) -> String {
+/// 写入普通列：文本直接使用 SQLite 返回的字节，其余类型经复用缓冲区格式化
+fn write_sqlite_field<W: std::io::Write>(
+    wtr: &mut csv::Writer<W>,
+    val: ValueRef<'_>,
+    scratch: &mut String,
+) -> csv::Result<()> {
+    match val {
+        ValueRef::Text(bytes) => wtr.write_field(bytes),
+        other => {
+            scratch.clear();
+            push_sqlite_value(scratch, other);
+            wtr.write_field(scratch.as_bytes())
+        }
+    }
+}
+
+/// 将 rusqlite 列值（借用）转换为 JSON 值，文本只在此处复制一次
+fn sqlite_value_to_json(val: ValueRef<'_>) -> serde_json::Value {
     match val {
-        rusqlite::types::Value::Null => String::new(),
-        rusqlite::types::Value::Integer(n) => n.to_string(),
-        rusqlite::types::Value::Real(f) => f.to_string(),
-        rusqlite::types::Value::Text(s) => s.clone(),
-        rusqlite::types::Value::Blob(b) => format!("[BLOB {} bytes]", b.len()),
+        ValueRef::Null => serde_json::Value::Null,
+        ValueRef::Integer(n) => serde_json::Value::Number(n.into()),
+        ValueRef::Real(f) => serde_json::Number::from_f64(f)
+            .map(serde_json::Value::Number)
+            .unwrap_or(serde_json::Value::Null),
+        ValueRef::Text(s) => serde_json::Value::String(String::from_utf8_lossy(s).into_owned()),
+        ValueRef::Blob(b) => serde_json::Value::String(format!("[BLOB {} bytes]", b.len())),
+    }
+}
+
+/// 将 rusqlite 列值（借用）追加为 CSV 字段文本（调用方复用缓冲区）
+fn push_sqlite_value(out: &mut String, val: ValueRef<'_>) {
+    use std::fmt::Write;
+    match val {
+        ValueRef::Null => {}
+        ValueRef::Integer(n) => {
+            let _ = write!(out, "{}", n);
+        }
+        ValueRef::Real(f) => {
+            let _ = write!(out, "{}", f);
+        }
+        ValueRef::Text(s) => out.push_str(&String::from_utf8_lossy(s)),
+        ValueRef::Blob(b) => {
+            let _ = write!(out, "[BLOB {} bytes]", b.len());
+        }
     }
 }
 
 #[cfg(test)]
 mod tests {
-    use super::{build_range_snapshot_command, normalize_sync_range, quote_python_single, quote_shell_single, resolve_local_db_path, validate_database_schema};
+    use super::{
+        build_compress_snapshot_command, build_full_snapshot_command, build_range_snapshot_command,
+        build_remote_cleanup_command, normalize_sync_range, parse_compressed_size,
+        parse_full_snapshot_output, parse_range_snapshot_output, quote_shell_single,
+        resolve_local_db_path, validate_database_schema, SnapshotMethod,
+    };
 
     #[test]
     fn should_prefer_target_path_when_provided() {
@@ -929,6 +1080,12 @@ mod tests {
         assert!(validate_database_schema(vec!["demand_results".to_string()]).is_ok());
     }
 
+    #[test]
+    fn should_validate_borrowed_table_names() {
+        assert!(validate_database_schema(["sqlite_sequence", "data_wide"]).is_ok());
+        assert!(validate_database_schema(["sqlite_sequence"]).is_err());
+    }
+
     #[test]
     fn should_accept_valid_sync_range() {
         let result = normalize_sync_range(Some(100), Some(200)).unwrap();
@@ -954,9 +1111,54 @@ mod tests {
     }
 
     #[test]
-    fn should_escape_single_quote_for_python() {
-        let escaped = quote_python_single("/mnt/a'b\\c.db");
-        assert_eq!(escaped, "/mnt/a\\'b\\\\c.db");
+    fn should_build_full_snapshot_command_in_single_exec() {
+        let cmd = build_full_snapshot_command("/mnt/data/device_data.db", "/tmp/out.db");
+        assert!(!cmd.contains('\n'));
+        assert!(cmd.contains("src='/mnt/data/device_data.db'"));
+        assert!(cmd.contains("dst='/tmp/out.db'"));
+        assert!(cmd.contains("sqlite3 \"$src\" \".backup '$dst'\""));
+        assert!(cmd.contains("py=$(command -v python3 || command -v python);"));
+        assert!(cmd.contains("s.backup(d)"));
+        assert!(cmd.contains("cp \"$src-wal\" \"$dst-wal\""));
+        assert!(cmd.contains("echo \"method:$m\""));
+    }
+
+    #[test]
+    fn should_parse_full_snapshot_output() {
+        let out = "method:python\n-rw-r--r-- 1 root root 4096 Jan 1 00:00 /tmp/out.db\n";
+        let (method, info) = parse_full_snapshot_output(out).unwrap();
+        assert_eq!(method, SnapshotMethod::PythonBackup);
+        assert_eq!(info.split_whitespace().nth(4), Some("4096"));
+        assert!(parse_full_snapshot_output("method:none\nls: cannot access: No such file or directory").is_none());
+        assert!(parse_full_snapshot_output("method:cp\nls: /tmp/out.db: No such file or directory").is_none());
+    }
+
+    #[test]
+    fn should_build_compress_snapshot_command() {
+        let cmd = build_compress_snapshot_command("/tmp/out.db");
+        assert!(cmd.starts_with("f='/tmp/out.db';"));
+        assert!(cmd.contains("gzip -1 -c \"$f\" > \"$f.gz\""));
+        assert!(cmd.contains("echo \"gzip:$(wc -c < \"$f.gz\")\""));
+    }
+
+    #[test]
+    fn should_build_remote_cleanup_command() {
+        assert_eq!(
+            build_remote_cleanup_command("/tmp/out.db"),
+            "f='/tmp/out.db'; rm -f \"$f\" \"$f.gz\" \"$f-wal\" \"$f-shm\""
+        );
+    }
+
+    #[test]
+    fn should_parse_compressed_size() {
+        assert_eq!(parse_compressed_size("method:sqlite3\n-rw-r--r-- 1 a a 100 x\ngzip:  42\n"), Some(42));
+        assert_eq!(parse_compressed_size("ok 100\n"), None);
+    }
+
+    #[test]
+    fn should_parse_range_snapshot_size() {
+        assert_eq!(parse_range_snapshot_output("ok 8192\n"), Some(8192));
+        assert_eq!(parse_range_snapshot_output("missing_tables:foo,bar\n"), None);
     }
 
     #[test]
@@ -969,14 +1171,14 @@ mod tests {
             10,
             20,
         );
-        assert!(cmd.contains("python3 -c \""));
-        assert!(cmd.contains("src_path='/mnt/data/device_data.db'"));
-        assert!(cmd.contains("dst_path='/tmp/out.db'"));
+        assert!(!cmd.contains('\n'));
+        assert!(cmd.starts_with("py=$(command -v python3 || command -v python) && \"$py\" -c 'import os,sqlite3,sys;"));
+        assert!(cmd.ends_with("' '/mnt/data/device_data.db' '/tmp/out.db' 1000 2000 10 20"));
         assert!(cmd.contains("ATTACH DATABASE ? AS srcdb"));
         assert!(cmd.contains("FROM srcdb.data_wide"));
         assert!(cmd.contains("FROM srcdb.demand_results"));
-        assert!(cmd.contains("(1000, 2000)"));
-        assert!(cmd.contains("(10, 20)"));
+        assert!(cmd.contains("ON data_wide(local_timestamp)"));
+        assert!(cmd.contains("ON demand_results(timestamp)"));
     }
 }
 
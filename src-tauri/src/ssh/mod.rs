@@ -1,8 +1,12 @@
 use async_ssh2_tokio::{Client, AuthMethod, ServerCheckMethod};
 use std::sync::{Arc, Mutex};
 use anyhow::{Result, Context};
+use russh_sftp::client::SftpSession;
+use russh_sftp::protocol::OpenFlags;
+use std::io::SeekFrom;
+use tokio::io::{AsyncReadExt, AsyncSeekExt, AsyncWriteExt};
 
-#[derive(Clone)]
+#[derive(Clone, PartialEq, Eq)]
 pub struct SshConfig {
     pub host: String,
     pub port: u16,
@@ -11,10 +15,17 @@ pub struct SshConfig {
     pub key_file: Option<String>,
 }
 
+/// 单引号安全转义（用于远程 shell 命令）
+pub(crate) fn quote_shell_single(value: &str) -> String {
+    format!("'{}'", value.replace('\'', "'\"'\"'"))
+}
+
 pub struct SshClient;
 
 static SSH_CLIENT: Mutex<Option<Arc<Client>>> = Mutex::new(None);
 static SSH_CONFIG: Mutex<Option<SshConfig>> = Mutex::new(None);
+/// 当前连接上缓存的 SFTP 会话（连同所属连接，用于判断连接是否已更换）
+static SFTP_SESSION: Mutex<Option<(Arc<Client>, Arc<SftpSession>)>> = Mutex::new(None);
 impl SshClient {
     fn log(message: &str) {
         eprintln!("{}", message);
@@ -22,68 +33,125 @@ impl SshClient {
 
     /// 连接到 SSH 服务器（类似 paramiko 的连接方式，针对 JumpServer 优化）
     pub async fn connect(config: SshConfig) -> Result<()> {
+        // 已有到同一目标、同一凭据的存活连接时直接复用，省去 TCP 建连、密钥交换与认证
+        if Self::reuse_existing(&config) {
+            Self::log(&format!("[SSH] 复用已有连接: {}@{}:{}", config.username, config.host, config.port));
+            return Ok(());
+        }
+        
+        // 即将建立新连接，旧连接上缓存的 SFTP 会话不再可用
+        Self::invalidate_sftp_session();
+        
         let addr = (&config.host[..], config.port);
         
-        // 尝试使用密钥文件认证（类似 paramiko 的 key_filename）
-        // 注意：async-ssh2-tokio 默认只使用指定的认证方法，相当于 paramiko 的
-        // look_for_keys=False（不自动查找密钥）和 allow_agent=False（不使用 SSH 代理）
+        // 按优先级排列可用的认证方式：密钥文件（存在时，类似 paramiko 的 key_filename）→ 密码。
+        // 注意：AuthMethod 只使用指定的认证方法，相当于 paramiko 的 look_for_keys=False
+        // （不自动查找密钥）和 allow_agent=False（不使用 SSH 代理），这对 JumpServer 很重要
+        let mut auth_methods: Vec<(&str, AuthMethod)> = Vec::with_capacity(2);
+        // 密钥文件只读取一次：读取成功即说明文件存在，省去单独的 exists 检查，
+        // 重试时也复用内存中的密钥内容，不再每次握手重新读盘
         if let Some(ref key_file) = config.key_file {
-            if std::path::Path::new(key_file).exists() {
-                let auth = AuthMethod::with_key_file(key_file, None);
-                match Client::connect(
-                    addr,
-                    &config.username,
-                    auth,
-                    ServerCheckMethod::NoCheck, // 自动接受服务器密钥（类似 AutoAddPolicy）
-                )
-                    .await
-                {
-                    Ok(client) => {
-                        // 密钥认证成功
-                        let client_arc = Arc::new(client);
-                        *SSH_CLIENT.lock().unwrap() = Some(client_arc);
-                        *SSH_CONFIG.lock().unwrap() = Some(config);
-                        return Ok(());
-                    }
-                    Err(e) => {
-                        eprintln!("密钥认证失败: {}, 尝试密码认证", e);
-                        // 继续尝试密码
-                    }
-                }
+            if let Ok(key) = tokio::fs::read_to_string(key_file).await {
+                auth_methods.push(("密钥", AuthMethod::with_key(&key, None)));
             }
         }
-        
-        // 使用密码认证（类似 paramiko 的 password）
-        // 注意：AuthMethod::with_password() 只使用密码认证，不会尝试密钥或代理
-        // 这相当于 paramiko 的 look_for_keys=False 和 allow_agent=False（对 JumpServer 很重要）
         if let Some(ref password) = config.password {
-            let auth = AuthMethod::with_password(password);
-            let client = Client::connect(
-                addr,
-                &config.username,
-                auth,
-                ServerCheckMethod::NoCheck, // 自动接受服务器密钥（类似 AutoAddPolicy）
-            )
-                .await
-            .with_context(|| format!("SSH 连接失败: {}@{}:{}", config.username, config.host, config.port))?;
-            
-                let client_arc = Arc::new(client);
-                *SSH_CLIENT.lock().unwrap() = Some(client_arc);
-            *SSH_CONFIG.lock().unwrap() = Some(config);
-                Ok(())
-        } else {
+            auth_methods.push(("密码", AuthMethod::with_password(password)));
+        }
+        if auth_methods.is_empty() {
             anyhow::bail!(
                 "缺少认证信息\n\n\
                 服务器: {}:{}\n\
                 用户名: {}\n\n\
                 请提供密码或密钥文件",
                 config.host, config.port, config.username
+            );
+        }
+        
+        // 依次尝试，成功即保存连接；全部失败时返回最后一个错误
+        let mut last_error = None;
+        for (name, auth) in auth_methods {
+            match Self::connect_with_retry(addr, &config.username, auth).await {
+                Ok(client) => {
+                    *SSH_CLIENT.lock().unwrap() = Some(Arc::new(client));
+                    *SSH_CONFIG.lock().unwrap() = Some(config);
+                    return Ok(());
+                }
+                Err(e) => {
+                    Self::log(&format!("{}认证失败: {}", name, e));
+                    last_error = Some(e);
+                }
+            }
+        }
+        Err(anyhow::Error::from(last_error.unwrap()))
+            .with_context(|| format!("SSH 连接失败: {}@{}:{}", config.username, config.host, config.port))
+    }
+
+    /// 建立连接；DNS 解析失败、连接被拒绝/超时等暂时性错误按指数退避（带随机抖动）重试，
+    /// 避免调用方紧密重连触发 sshd 的 MaxStartups 限流。认证失败不重试，直接返回
+    async fn connect_with_retry(
+        addr: (&str, u16),
+        username: &str,
+        auth: AuthMethod,
+    ) -> std::result::Result<Client, async_ssh2_tokio::Error> {
+        let mut attempt = 0;
+        loop {
+            let result = Client::connect_with_config(
+                addr,
+                username,
+                auth.clone(),
+                ServerCheckMethod::NoCheck, // 自动接受服务器密钥（类似 AutoAddPolicy）
+                Self::connection_config(),
             )
+            .await;
+            let retryable = matches!(
+                result,
+                Err(async_ssh2_tokio::Error::AddressInvalid(_) | async_ssh2_tokio::Error::SshError(_))
+            );
+            attempt += 1;
+            if !retryable || attempt >= SSH_CONNECT_MAX_ATTEMPTS {
+                return result;
+            }
+            let delay = connect_retry_delay(attempt);
+            if let Err(ref e) = result {
+                Self::log(&format!(
+                    "[SSH] 连接失败（第 {} 次）: {}，{:.1} 秒后重试",
+                    attempt,
+                    e,
+                    delay.as_secs_f64()
+                ));
+            }
+            tokio::time::sleep(delay).await;
         }
     }
 
+    /// SSH 连接参数：定期发送保活，避免空闲连接被 NAT/防火墙静默断开；
+    /// 关闭 Nagle 算法，短命令的小数据包不再被延迟合并发送；
+    /// 增大通道窗口，大文件下载时对端可连续发送更多数据，减少等待窗口调整的往返
+    fn connection_config() -> russh::client::Config {
+        russh::client::Config {
+            keepalive_interval: Some(std::time::Duration::from_secs(SSH_KEEPALIVE_INTERVAL_SECS)),
+            keepalive_max: SSH_KEEPALIVE_MAX,
+            nodelay: true,
+            window_size: SSH_WINDOW_SIZE,
+            ..Default::default()
+        }
+    }
+
+    /// 当前连接的配置与请求一致且连接仍存活时返回 true
+    fn reuse_existing(config: &SshConfig) -> bool {
+        let same_config = SSH_CONFIG.lock().unwrap().as_ref() == Some(config);
+        same_config
+            && SSH_CLIENT
+                .lock()
+                .unwrap()
+                .as_ref()
+                .map_or(false, |client| !client.is_closed())
+    }
+
     /// 断开 SSH 连接
     pub async fn disconnect() {
+        Self::invalidate_sftp_session();
         if let Some(client) = SSH_CLIENT.lock().unwrap().take() {
             // Client 在 Drop 时会自动关闭连接
             drop(client);
@@ -108,13 +176,16 @@ impl SshClient {
         // 记录命令执行开始时间
         let start_time = std::time::Instant::now();
         
-        // 截取命令的前100个字符用于日志（避免日志过长）
-        let cmd_preview = if command.len() > 100 {
-            format!("{}...", &command[..100])
-        } else {
-            command.to_string()
-        };
-        Self::log(&format!("[SSH] 开始执行命令 (长度: {}): {}", command.len(), cmd_preview));
+        // 截取命令的前100个字符用于日志（避免日志过长）；按字符边界切片，
+        // 不另行拷贝命令，也不会在多字节字符中间截断
+        let preview_end = command.char_indices().nth(100).map_or(command.len(), |(i, _)| i);
+        let ellipsis = if preview_end < command.len() { "..." } else { "" };
+        Self::log(&format!(
+            "[SSH] 开始执行命令 (长度: {}): {}{}",
+            command.len(),
+            &command[..preview_end],
+            ellipsis
+        ));
         
         // 执行命令（async-ssh2-tokio 提供了便捷的 execute 方法）
         let result = client
@@ -133,99 +204,352 @@ impl SshClient {
         ))
     }
 
-    /// 上传文件到远程服务器（使用 SFTP，类似 paramiko 的 put）
-    pub async fn upload_file(local_path: &str, remote_path: &str) -> Result<()> {
+    /// 在已有连接上新开通道并建立 SFTP 会话
+    async fn open_sftp(client: &Client) -> Result<SftpSession> {
+        let channel = client.get_channel().await
+            .with_context(|| "建立SFTP通道失败")?;
+        channel.request_subsystem(true, "sftp").await
+            .with_context(|| "请求SFTP子系统失败")?;
+        SftpSession::new(channel.into_stream()).await
+            .with_context(|| "创建SFTP会话失败")
+    }
+
+    /// 获取当前连接上缓存的 SFTP 会话，不存在或连接已更换时新建并缓存。
+    /// 同一会话内的请求可以并发在途，上传、下载之间共用，省去每次传输的通道与子系统握手
+    pub async fn sftp_session() -> Result<Arc<SftpSession>> {
         let client = Self::get_client()?;
+        if let Some((owner, sftp)) = SFTP_SESSION.lock().unwrap().as_ref() {
+            if Arc::ptr_eq(owner, &client) {
+                return Ok(sftp.clone());
+            }
+        }
+        let sftp = Arc::new(Self::open_sftp(&client).await?);
+        *SFTP_SESSION.lock().unwrap() = Some((client, sftp.clone()));
+        Ok(sftp)
+    }
+
+    /// 丢弃缓存的 SFTP 会话；传输出错后调用，下次使用时重新建立
+    pub fn invalidate_sftp_session() {
+        SFTP_SESSION.lock().unwrap().take();
+    }
+
+    /// 通过已有 SFTP 会话将内存中的内容直接写入远程文件，适用于服务文件等小文件，无需经过本地临时文件
+    pub async fn upload_bytes_with_session(
+        sftp: &SftpSession,
+        data: &[u8],
+        remote_path: &str,
+    ) -> Result<()> {
+        let mut remote_file = sftp
+            .open_with_flags(remote_path, OpenFlags::CREATE | OpenFlags::TRUNCATE | OpenFlags::WRITE)
+            .await
+            .with_context(|| format!("创建远程文件失败: {}", remote_path))?;
+        remote_file.write_all(data).await
+            .with_context(|| format!("写入远程文件失败: {}", remote_path))?;
+        remote_file.shutdown().await
+            .with_context(|| format!("关闭远程文件失败: {}", remote_path))?;
+        Ok(())
+    }
+
+    /// 通过已有 SFTP 会话上传文件（流式 SFTP，类似 paramiko 的 putfo）
+    /// 本地文件按 1MB 块读取后写入远程句柄；多个文件共用一个会话时省去每个文件的通道与子系统握手
+    pub async fn upload_file_with_session(
+        sftp: &SftpSession,
+        local_path: &str,
+        remote_path: &str,
+    ) -> Result<()> {
+        let start_time = std::time::Instant::now();
+        Self::log(&format!("[SFTP] 开始上传文件: {} -> {}", local_path, remote_path));
         
-        // upload_file(本地路径, 远程路径, 权限, 块大小, 是否覆盖)
-        client
-            .upload_file(local_path, remote_path, None, None, true)
+        let mut local_file = tokio::fs::File::open(local_path).await
+            .with_context(|| format!("打开本地文件失败: {}", local_path))?;
+        let mut remote_file = sftp
+            .open_with_flags(remote_path, OpenFlags::CREATE | OpenFlags::TRUNCATE | OpenFlags::WRITE)
             .await
-            .with_context(|| format!("上传文件失败: {} -> {}", local_path, remote_path))?;
+            .with_context(|| format!("创建远程文件失败: {}", remote_path))?;
+        
+        let mut total_bytes = 0u64;
+        let mut buf = vec![0u8; UPLOAD_CHUNK_SIZE];
+        loop {
+            let n = local_file.read(&mut buf).await
+                .with_context(|| format!("读取本地文件失败: {}", local_path))?;
+            if n == 0 {
+                break;
+            }
+            remote_file.write_all(&buf[..n]).await
+                .with_context(|| format!("上传文件失败: {} -> {}", local_path, remote_path))?;
+            total_bytes += n as u64;
+        }
+        // 关闭远程句柄，确保服务端落盘
+        remote_file.shutdown().await
+            .with_context(|| format!("关闭远程文件失败: {}", remote_path))?;
+        
+        let elapsed = start_time.elapsed();
+        Self::log(&format!("[SFTP] 文件上传完成 | {:.2}MB | 耗时: {:.1}秒",
+            total_bytes as f64 / 1024.0 / 1024.0, elapsed.as_secs_f64()));
         
         Ok(())
     }
 
-    /// 从远程服务器下载文件（流式 SFTP，分块读写，不将整个文件加载到内存）
-    pub async fn download_file(remote_path: &str, local_path: &str) -> Result<()> {
+    /// 从远程服务器下载文件（流式 SFTP，分块读写，不将整个文件加载到内存），返回下载的字节数
+    pub async fn download_file(remote_path: &str, local_path: &str) -> Result<u64> {
         Self::download_file_with_progress(remote_path, local_path, None, None).await
     }
 
     /// 带进度回调的下载，on_progress(downloaded_bytes, total_bytes)，每约 2% 进度调用一次
+    /// 已知大小的大文件按分段并行下载，其余情况单流顺序下载；返回写入本地的字节数
     pub async fn download_file_with_progress(
         remote_path: &str,
         local_path: &str,
         total_size: Option<u64>,
         on_progress: Option<std::sync::Arc<dyn Fn(u64, u64) + Send + Sync>>,
-    ) -> Result<()> {
-        use tokio::io::{AsyncReadExt, AsyncWriteExt};
-        use russh_sftp::{client::SftpSession, protocol::OpenFlags};
-        
-        let client = Self::get_client()?;
-        
+    ) -> Result<u64> {
         let start_time = std::time::Instant::now();
         Self::log(&format!("[SFTP] 开始下载文件: {} -> {}", remote_path, local_path));
         
-        let channel = client.get_channel().await
-            .with_context(|| "建立SFTP通道失败")?;
-        channel.request_subsystem(true, "sftp").await
-            .with_context(|| "请求SFTP子系统失败")?;
-        let sftp = SftpSession::new(channel.into_stream()).await
-            .with_context(|| "创建SFTP会话失败")?;
+        let sftp = Self::sftp_session().await?;
         
+        let mut progress = DownloadProgress::new(total_size, on_progress);
+        let result = match total_size {
+            Some(total) if total >= PARALLEL_DOWNLOAD_MIN_SIZE => {
+                Self::download_segmented(sftp, remote_path, local_path, total, &mut progress).await
+            }
+            _ => {
+                Self::download_sequential(&sftp, remote_path, local_path, &mut progress).await
+            }
+        };
+        if result.is_err() {
+            Self::invalidate_sftp_session();
+        }
+        result?;
+        progress.finish();
+        let total_bytes = progress.downloaded;
+        
+        let elapsed = start_time.elapsed();
+        let speed = if elapsed.as_secs_f64() > 0.0 {
+            total_bytes as f64 / 1024.0 / 1024.0 / elapsed.as_secs_f64()
+        } else {
+            0.0
+        };
+        Self::log(&format!("[SFTP] 文件下载完成 | {:.2}MB | 耗时: {:.1}秒 | 速度: {:.1}MB/s", 
+            total_bytes as f64 / 1024.0 / 1024.0, elapsed.as_secs_f64(), speed));
+        
+        Ok(total_bytes)
+    }
+
+    /// 单流顺序下载：本地写盘放到独立任务中，远程读取与本地写入并行进行
+    async fn download_sequential(
+        sftp: &SftpSession,
+        remote_path: &str,
+        local_path: &str,
+        progress: &mut DownloadProgress,
+    ) -> Result<()> {
         let mut remote_file = sftp.open_with_flags(remote_path, OpenFlags::READ).await
             .with_context(|| format!("打开远程文件失败: {}", remote_path))?;
         
         let mut local_file = tokio::fs::File::create(local_path).await
             .with_context(|| format!("创建本地文件失败: {}", local_path))?;
         
-        let mut total_bytes: u64 = 0;
-        let mut last_log_bytes: u64 = 0;
-        let mut last_emit_pct: u8 = 0;
-        let mut buf = vec![0u8; 256 * 1024];
+        // 读到的数据块经有界通道交给写盘任务，网络读取不再等待磁盘写入
+        let (chunk_tx, mut chunk_rx) = tokio::sync::mpsc::channel::<Vec<u8>>(8);
+        let writer = tokio::spawn(async move {
+            while let Some(chunk) = chunk_rx.recv().await {
+                local_file.write_all(&chunk).await
+                    .with_context(|| "写入本地文件失败")?;
+            }
+            local_file.flush().await
+                .with_context(|| "刷新本地文件失败")
+        });
         
         loop {
+            let mut buf = vec![0u8; DOWNLOAD_CHUNK_SIZE];
             let n = remote_file.read(&mut buf).await
                 .with_context(|| "读取远程文件数据失败")?;
             if n == 0 {
                 break;
             }
-            local_file.write_all(&buf[..n]).await
-                .with_context(|| "写入本地文件失败")?;
-            total_bytes += n as u64;
-            
-            if total_bytes - last_log_bytes >= 10 * 1024 * 1024 {
-                Self::log(&format!("[SFTP] 已下载: {:.1}MB", total_bytes as f64 / 1024.0 / 1024.0));
-                last_log_bytes = total_bytes;
-            }
-            
-            if let (Some(ref cb), Some(total)) = (&on_progress, &total_size) {
-                if *total > 0 {
-                    let pct = (total_bytes * 100 / *total).min(100) as u8;
-                    if pct >= last_emit_pct + 2 || pct == 100 {
-                        last_emit_pct = pct;
-                        cb(total_bytes, *total);
-                    }
-                }
+            buf.truncate(n);
+            if chunk_tx.send(buf).await.is_err() {
+                // 写盘任务已提前退出，错误在下方 join 时返回
+                break;
             }
+            progress.advance(n as u64);
+        }
+        
+        drop(chunk_tx);
+        writer.await
+            .with_context(|| "本地写盘任务异常退出")??;
+        Ok(())
+    }
+
+    /// 分段并行下载：文件按字节区间切成若干段，每段各自打开远程句柄并写入本地文件的对应位置。
+    /// 单个句柄同一时刻只有一个读请求在途，吞吐受往返延迟限制；多段并行让多个读请求同时在途。
+    async fn download_segmented(
+        sftp: Arc<SftpSession>,
+        remote_path: &str,
+        local_path: &str,
+        total: u64,
+        progress: &mut DownloadProgress,
+    ) -> Result<()> {
+        // 预先分配本地文件大小，各段直接定位写入
+        let local_file = tokio::fs::File::create(local_path).await
+            .with_context(|| format!("创建本地文件失败: {}", local_path))?;
+        local_file.set_len(total).await
+            .with_context(|| "预分配本地文件失败")?;
+        drop(local_file);
+        
+        let (progress_tx, mut progress_rx) = tokio::sync::mpsc::unbounded_channel::<u64>();
+        let segment_len = total.div_ceil(PARALLEL_DOWNLOAD_SEGMENTS);
+        let mut segments = tokio::task::JoinSet::new();
+        let mut start = 0u64;
+        while start < total {
+            let len = segment_len.min(total - start);
+            segments.spawn(Self::download_segment(
+                sftp.clone(),
+                remote_path.to_string(),
+                local_path.to_string(),
+                start,
+                len,
+                progress_tx.clone(),
+            ));
+            start += len;
         }
+        drop(progress_tx);
         
-        if let (Some(ref cb), Some(total)) = (&on_progress, &total_size) {
-            cb(total_bytes, *total);
+        // 所有分段结束后通道关闭，循环退出
+        while let Some(n) = progress_rx.recv().await {
+            progress.advance(n);
+        }
+        while let Some(result) = segments.join_next().await {
+            result.with_context(|| "下载分段任务异常退出")??;
         }
+        Ok(())
+    }
+
+    /// 下载 [start, start + len) 区间到本地文件的相同偏移
+    async fn download_segment(
+        sftp: Arc<SftpSession>,
+        remote_path: String,
+        local_path: String,
+        start: u64,
+        len: u64,
+        progress_tx: tokio::sync::mpsc::UnboundedSender<u64>,
+    ) -> Result<()> {
+        let mut remote_file = sftp.open_with_flags(&remote_path, OpenFlags::READ).await
+            .with_context(|| format!("打开远程文件失败: {}", remote_path))?;
+        remote_file.seek(SeekFrom::Start(start)).await
+            .with_context(|| "定位远程文件失败")?;
+        let mut local_file = tokio::fs::OpenOptions::new()
+            .write(true)
+            .open(&local_path)
+            .await
+            .with_context(|| format!("打开本地文件失败: {}", local_path))?;
+        local_file.seek(SeekFrom::Start(start)).await
+            .with_context(|| "定位本地文件失败")?;
         
+        let mut remaining = len;
+        let mut buf = vec![0u8; DOWNLOAD_CHUNK_SIZE];
+        while remaining > 0 {
+            let want = remaining.min(buf.len() as u64) as usize;
+            let n = remote_file.read(&mut buf[..want]).await
+                .with_context(|| "读取远程文件数据失败")?;
+            if n == 0 {
+                anyhow::bail!("远程文件长度小于预期: {}", remote_path);
+            }
+            local_file.write_all(&buf[..n]).await
+                .with_context(|| "写入本地文件失败")?;
+            remaining -= n as u64;
+            let _ = progress_tx.send(n as u64);
+        }
         local_file.flush().await
             .with_context(|| "刷新本地文件失败")?;
+        Ok(())
+    }
+}
+
+/// SSH 保活间隔（秒）
+const SSH_KEEPALIVE_INTERVAL_SECS: u64 = 30;
+/// 连续多少次保活无响应后判定连接断开
+const SSH_KEEPALIVE_MAX: usize = 3;
+/// SSH 通道接收窗口大小（russh 默认 2MB）
+const SSH_WINDOW_SIZE: u32 = 16 * 1024 * 1024;
+/// 暂时性错误时连接的最大尝试次数（含首次）
+const SSH_CONNECT_MAX_ATTEMPTS: u32 = 3;
+/// 连接重试的基础退避时间（毫秒），每次翻倍
+const SSH_CONNECT_RETRY_BASE_MS: u64 = 500;
+/// 连接重试退避时间上限（毫秒）
+const SSH_CONNECT_RETRY_CAP_MS: u64 = 5000;
+/// 上传时本地单次读取的块大小
+const UPLOAD_CHUNK_SIZE: usize = 1024 * 1024;
+/// SFTP 单次读取的块大小
+const DOWNLOAD_CHUNK_SIZE: usize = 256 * 1024;
+/// 分段并行下载的段数（同时在途的读请求数）
+const PARALLEL_DOWNLOAD_SEGMENTS: u64 = 4;
+/// 小于该大小的文件按单流顺序下载，避免为小文件多开句柄
+const PARALLEL_DOWNLOAD_MIN_SIZE: u64 = 8 * 1024 * 1024;
+
+/// 第 attempt 次失败后的退避时间：base * 2^(attempt-1)，不超过上限，再乘以 0.5~1.5 的随机抖动，
+/// 避免多个客户端同时重连
+fn connect_retry_delay(attempt: u32) -> std::time::Duration {
+    let backoff = (SSH_CONNECT_RETRY_BASE_MS << (attempt - 1).min(16)).min(SSH_CONNECT_RETRY_CAP_MS);
+    // 无需引入随机数库，取当前时间的纳秒部分作为抖动来源
+    let nanos = std::time::SystemTime::now()
+        .duration_since(std::time::UNIX_EPOCH)
+        .map_or(0, |d| d.subsec_nanos());
+    let jitter_permille = 500 + u64::from(nanos % 1001);
+    std::time::Duration::from_millis(backoff * jitter_permille / 1000)
+}
+
+/// 下载进度统计：每 10MB 输出一次日志，每约 2% 调用一次进度回调
+struct DownloadProgress {
+    total_size: Option<u64>,
+    on_progress: Option<Arc<dyn Fn(u64, u64) + Send + Sync>>,
+    downloaded: u64,
+    last_log_bytes: u64,
+    last_emit_pct: u8,
+    /// 最近一次回调时的已下载字节数，用于跳过与上次完全相同的进度
+    last_emit_bytes: Option<u64>,
+}
+
+impl DownloadProgress {
+    fn new(total_size: Option<u64>, on_progress: Option<Arc<dyn Fn(u64, u64) + Send + Sync>>) -> Self {
+        Self {
+            total_size,
+            on_progress,
+            downloaded: 0,
+            last_log_bytes: 0,
+            last_emit_pct: 0,
+            last_emit_bytes: None,
+        }
+    }
+
+    fn advance(&mut self, n: u64) {
+        self.downloaded += n;
         
-        let elapsed = start_time.elapsed();
-        let speed = if elapsed.as_secs_f64() > 0.0 {
-            total_bytes as f64 / 1024.0 / 1024.0 / elapsed.as_secs_f64()
-        } else {
-            0.0
-        };
-        Self::log(&format!("[SFTP] 文件下载完成 | {:.2}MB | 耗时: {:.1}秒 | 速度: {:.1}MB/s", 
-            total_bytes as f64 / 1024.0 / 1024.0, elapsed.as_secs_f64(), speed));
+        if self.downloaded - self.last_log_bytes >= 10 * 1024 * 1024 {
+            SshClient::log(&format!("[SFTP] 已下载: {:.1}MB", self.downloaded as f64 / 1024.0 / 1024.0));
+            self.last_log_bytes = self.downloaded;
+        }
         
-        Ok(())
+        if let (Some(cb), Some(total)) = (&self.on_progress, self.total_size) {
+            if total > 0 {
+                let pct = (self.downloaded * 100 / total).min(100) as u8;
+                // 到达 100% 只回调一次；远程文件在下载期间变大时也不会在之后每块都重复回调
+                if pct >= self.last_emit_pct + 2 || (pct == 100 && self.last_emit_pct < 100) {
+                    self.last_emit_pct = pct;
+                    self.last_emit_bytes = Some(self.downloaded);
+                    cb(self.downloaded, total);
+                }
+            }
+        }
+    }
+
+    fn finish(&self) {
+        // 最后一块已经以相同进度回调过时不再重复发送
+        if self.last_emit_bytes == Some(self.downloaded) {
+            return;
+        }
+        if let (Some(cb), Some(total)) = (&self.on_progress, self.total_size) {
+            cb(self.downloaded, total);
+        }
     }
 }
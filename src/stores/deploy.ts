@@ -1,6 +1,6 @@
 import { defineStore } from "pinia";
 import { invoke } from "@tauri-apps/api/core";
-import { listen } from "@tauri-apps/api/event";
+import { listenBatchedLogs, type BatchedLogListener } from "../utils/logEvents";
 
 export interface DeployFile {
   localPath?: string;      // 本地文件路径（用于上传）
@@ -21,6 +21,9 @@ export interface DeployStatus {
   serviceEnabled: boolean;
 }
 
+// deploy-log 监听在首次部署时注册一次并常驻，每次部署不再反复注册/注销
+let deployLogListener: Promise<BatchedLogListener> | null = null;
+
 export const useDeployStore = defineStore("deploy", {
   state: () => ({
     status: null as DeployStatus | null,
@@ -30,6 +33,19 @@ export const useDeployStore = defineStore("deploy", {
   }),
 
   actions: {
+    ensureLogListener(): Promise<BatchedLogListener> {
+      if (!deployLogListener) {
+        deployLogListener = listenBatchedLogs("deploy-log", (batch) => {
+          this.logs.push(...batch);
+        }).catch((error) => {
+          // 注册失败时允许下次重试
+          deployLogListener = null;
+          throw error;
+        });
+      }
+      return deployLogListener;
+    },
+
     async checkStatus(): Promise<void> {
       this.error = null;
       try {
@@ -46,16 +62,16 @@ export const useDeployStore = defineStore("deploy", {
       this.error = null;
       this.logs = [];
 
-      // 监听实时日志事件
-      const unlisten = await listen<string>("deploy-log", (event) => {
-        this.logs.push(event.payload);
-      });
+      // 监听实时日志事件（按帧批量追加）
+      const logListener = await this.ensureLogListener();
 
       try {
         const result = await invoke<{ success: boolean; error?: string; logs: string[] }>(
           "deploy_application",
           { config }
         );
+        // 先追加尚未刷新的日志，再与返回的日志比较
+        logListener.flush();
 
         // 如果事件监听没有接收到所有日志，使用返回的日志作为补充
         if (result.logs && result.logs.length > this.logs.length) {
@@ -70,11 +86,10 @@ export const useDeployStore = defineStore("deploy", {
       } catch (error) {
         const errorMsg = error instanceof Error ? error.message : String(error);
         this.error = errorMsg;
+        logListener.flush();
         this.logs.push(`错误: ${errorMsg}`);
         return { success: false, error: errorMsg };
       } finally {
-        // 取消事件监听
-        unlisten();
         this.deploying = false;
       }
     },
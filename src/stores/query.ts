@@ -1,6 +1,8 @@
 import { defineStore } from "pinia";
+import { markRaw } from "vue";
 import { invoke } from "@tauri-apps/api/core";
 import { listen } from "@tauri-apps/api/event";
+import { listenBatchedLogs, type BatchedLogListener } from "../utils/logEvents";
 
 // 注意：时间格式化已由后端统一处理，前端不再需要格式化函数
 
@@ -44,7 +46,8 @@ export interface ExportDemandResultsParams {
 
 export interface QueryResult {
   columns: string[];
-  rows: Record<string, any>[];
+  // 行数据按列位置存放，与 columns 一一对应
+  rows: any[][];
   totalRows: number;
 }
 
@@ -61,23 +64,40 @@ const defaultSourceConfig: QuerySourceConfig = {
   lastReadyAt: null,
 };
 
+// 最近一次读取或写入 localStorage 的配置序列化结果，内容未变化时跳过写入
+let lastSavedSourceConfig: string | null = null;
+// 与 lastSavedSourceConfig 对应的配置对象，存储内容未变化时直接复用，跳过 JSON 解析
+let cachedSourceConfig: QuerySourceConfig | null = null;
+// 路径输入框逐字输入时延迟保存，停止输入 300ms 后才写入一次
+const SAVE_DEBOUNCE_MS = 300;
+let saveSourceConfigTimer: ReturnType<typeof setTimeout> | undefined;
+
 function loadSourceConfigFromStorage(): QuerySourceConfig {
   try {
     const saved = localStorage.getItem(SOURCE_CONFIG_KEY);
+    if (cachedSourceConfig && saved === lastSavedSourceConfig) {
+      return { ...cachedSourceConfig };
+    }
+    lastSavedSourceConfig = saved;
+    cachedSourceConfig = null;
     if (!saved) {
       return { ...defaultSourceConfig };
     }
 
     const parsed = JSON.parse(saved) as Partial<QuerySourceConfig>;
-    return {
+    cachedSourceConfig = {
       ...defaultSourceConfig,
       ...parsed,
     };
+    return { ...cachedSourceConfig };
   } catch {
     return { ...defaultSourceConfig };
   }
 }
 
+// query-log 监听在首次使用时注册一次并常驻，各操作不再反复注册/注销
+let queryLogListener: Promise<BatchedLogListener> | null = null;
+
 export const useQueryStore = defineStore("query", {
   state: () => ({
     results: null as QueryResult | null,
@@ -102,6 +122,19 @@ export const useQueryStore = defineStore("query", {
   }),
 
   actions: {
+    ensureLogListener(): Promise<BatchedLogListener> {
+      if (!queryLogListener) {
+        queryLogListener = listenBatchedLogs("query-log", (batch) => {
+          this.logs.push(...batch);
+        }).catch((error) => {
+          // 注册失败时允许下次重试
+          queryLogListener = null;
+          throw error;
+        });
+      }
+      return queryLogListener;
+    },
+
     loadSourceConfig() {
       const config = loadSourceConfigFromStorage();
       this.sourceMode = config.sourceMode;
@@ -113,6 +146,9 @@ export const useQueryStore = defineStore("query", {
     },
 
     saveSourceConfig() {
+      // 立即写入时取消尚未执行的延迟保存
+      clearTimeout(saveSourceConfigTimer);
+      saveSourceConfigTimer = undefined;
       const config: QuerySourceConfig = {
         sourceMode: this.sourceMode,
         remoteDbPath: this.remoteDbPath,
@@ -121,7 +157,16 @@ export const useQueryStore = defineStore("query", {
         activeDbPath: this.activeDbPath,
         lastReadyAt: this.lastReadyAt,
       };
-      localStorage.setItem(SOURCE_CONFIG_KEY, JSON.stringify(config));
+      const serialized = JSON.stringify(config);
+      if (serialized === lastSavedSourceConfig) return;
+      localStorage.setItem(SOURCE_CONFIG_KEY, serialized);
+      lastSavedSourceConfig = serialized;
+      cachedSourceConfig = config;
+    },
+
+    scheduleSaveSourceConfig() {
+      clearTimeout(saveSourceConfigTimer);
+      saveSourceConfigTimer = setTimeout(() => this.saveSourceConfig(), SAVE_DEBOUNCE_MS);
     },
 
     setSourceMode(mode: SourceMode) {
@@ -131,12 +176,12 @@ export const useQueryStore = defineStore("query", {
 
     setRemoteDbPath(path: string) {
       this.remoteDbPath = path;
-      this.saveSourceConfig();
+      this.scheduleSaveSourceConfig();
     },
 
     setSyncTargetPath(path: string) {
       this.syncTargetPath = path;
-      this.saveSourceConfig();
+      this.scheduleSaveSourceConfig();
     },
 
     setImportedDbPath(path: string) {
@@ -163,11 +208,8 @@ export const useQueryStore = defineStore("query", {
       this.exportedRows = 0;
       this.exportedPath = null;
 
-      // 监听实时日志事件（后端已经包含了时间戳和格式化的日志）
-      const unlisten = await listen<string>("query-log", (event) => {
-        // 后端已经包含了时间戳，直接添加
-        this.logs.push(event.payload);
-      });
+      // 确保实时日志监听已注册（后端已经包含了时间戳和格式化的日志）
+      await this.ensureLogListener();
 
       try {
         this.updateProgress(10, "开始导出...");
@@ -184,8 +226,6 @@ export const useQueryStore = defineStore("query", {
         this.progressMessage = "导出失败";
         // 错误信息通过后端日志事件已经发送，这里只更新UI状态
       } finally {
-        // 取消事件监听
-        unlisten();
         this.loading = false;
       }
     },
@@ -199,11 +239,8 @@ export const useQueryStore = defineStore("query", {
       this.exportedRows = 0;
       this.exportedPath = null;
 
-      // 监听实时日志事件（后端已经包含了时间戳和格式化的日志）
-      const unlisten = await listen<string>("query-log", (event) => {
-        // 后端已经包含了时间戳，直接添加
-        this.logs.push(event.payload);
-      });
+      // 确保实时日志监听已注册（后端已经包含了时间戳和格式化的日志）
+      await this.ensureLogListener();
 
       try {
         this.updateProgress(10, "开始导出...");
@@ -220,8 +257,6 @@ export const useQueryStore = defineStore("query", {
         this.progressMessage = "导出失败";
         // 错误信息通过后端日志事件已经发送，这里只更新UI状态
       } finally {
-        // 取消事件监听
-        unlisten();
         this.loading = false;
       }
     },
@@ -233,11 +268,8 @@ export const useQueryStore = defineStore("query", {
       this.progressMessage = "正在连接...";
       this.logs = [];
 
-      // 监听实时日志事件（后端已经包含了时间戳和格式化的日志）
-      const unlisten = await listen<string>("query-log", (event) => {
-        // 后端已经包含了时间戳，直接添加
-        this.logs.push(event.payload);
-      });
+      // 确保实时日志监听已注册（后端已经包含了时间戳和格式化的日志）
+      await this.ensureLogListener();
 
       try {
         this.updateProgress(10, "开始查询...");
@@ -249,7 +281,8 @@ export const useQueryStore = defineStore("query", {
           }
         });
         
-        this.results = result;
+        // 结果行数可能很大且只读，标记为非响应式，避免为每一行、每个单元格创建代理
+        this.results = markRaw(result);
         this.progress = 100;
         this.progressMessage = `查询完成 (${result.totalRows} 条记录)`;
       } catch (error) {
@@ -258,8 +291,6 @@ export const useQueryStore = defineStore("query", {
         this.progressMessage = "查询失败";
         // 错误信息通过后端日志事件已经发送，这里只更新UI状态
       } finally {
-        // 取消事件监听
-        unlisten();
         this.loading = false;
       }
     },
@@ -271,19 +302,24 @@ export const useQueryStore = defineStore("query", {
       this.syncProgress = 0;
       this.syncProgressMessage = "准备同步...";
 
-      const unlistenLog = await listen<string>("query-log", (event) => {
-        this.logs.push(event.payload);
-      });
-
-      const unlistenProgress = await listen<{
-        downloaded: number;
-        total: number;
-        percent: number;
-      }>("db-sync-progress", (event) => {
-        const { downloaded, total, percent } = event.payload;
+      await this.ensureLogListener();
+
+      // 进度事件只记录最新一条，每帧最多刷新一次界面，多余的中间进度直接被覆盖
+      type SyncProgressPayload = { downloaded: number; total: number; percent: number };
+      let pendingProgress: SyncProgressPayload | null = null;
+      let progressFrame = 0;
+      const flushProgress = () => {
+        progressFrame = 0;
+        if (!pendingProgress) return;
+        const { downloaded, total, percent } = pendingProgress;
+        pendingProgress = null;
         this.syncProgress = percent;
         const mb = (n: number) => (n / 1024 / 1024).toFixed(2);
         this.syncProgressMessage = `${mb(downloaded)}MB / ${mb(total)}MB (${percent}%)`;
+      };
+      const unlistenProgress = await listen<SyncProgressPayload>("db-sync-progress", (event) => {
+        pendingProgress = event.payload;
+        if (!progressFrame) progressFrame = requestAnimationFrame(flushProgress);
       });
 
       try {
@@ -305,8 +341,9 @@ export const useQueryStore = defineStore("query", {
         this.error = errorMsg;
         this.syncProgressMessage = "同步失败";
       } finally {
-        unlistenLog();
         unlistenProgress();
+        // 丢弃尚未刷新的中间进度，避免覆盖上面已设置的完成/失败状态
+        if (progressFrame) cancelAnimationFrame(progressFrame);
         this.syncing = false;
       }
     },
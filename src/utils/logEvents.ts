@@ -0,0 +1,31 @@
+import { listen } from "@tauri-apps/api/event";
+
+export interface BatchedLogListener {
+  // 立即追加尚未刷新的日志
+  flush: () => void;
+}
+
+// 监听后端日志事件：日志可能在短时间内密集到达，先暂存，每帧合并为一次 append，
+// 减少响应式更新与日志列表重渲染的次数。监听注册后常驻，不提供注销
+export async function listenBatchedLogs(
+  eventName: string,
+  append: (batch: string[]) => void
+): Promise<BatchedLogListener> {
+  let pending: string[] = [];
+  let frame = 0;
+  const flush = () => {
+    if (frame) {
+      cancelAnimationFrame(frame);
+      frame = 0;
+    }
+    if (pending.length === 0) return;
+    const batch = pending;
+    pending = [];
+    append(batch);
+  };
+  await listen<string>(eventName, (event) => {
+    pending.push(event.payload);
+    if (!frame) frame = requestAnimationFrame(flush);
+  });
+  return { flush };
+}